@@ -1,48 +1,220 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Header, Request, Response
+from typing import Optional
+from fastapi.responses import FileResponse, StreamingResponse
+from email.utils import formatdate, parsedate_to_datetime
+import asyncio
+import json
+import stat
+import time
 import uuid
 import os
+from app.core.config import SSE_HEARTBEAT_SECONDS, SSE_POLL_INTERVAL, FILE_CACHE_MAX_AGE, DOCUMENTS
 from app.schemas.job import JobRequest
-from app.services.job_store import get_job, create_job, get_generated_files
-from app.services.tasks import background_download_task
+from app.services.job_events import broker
+from app.services.zip_stream import iter_zip
+from app.services.job_store import (
+    get_job, create_or_attach_job, list_jobs, get_generated_files, get_file_info, job_status_event,
+    FINISHED_STATUSES, PUBLISH_EVENTS
+)
+from app.services.tasks import submit_job, queue_position, job_owner
 
 router = APIRouter()
 
 @router.post("/download")
-async def start_download(request: JobRequest, background_tasks: BackgroundTasks):
-    """Starts a download job."""
-    job_id = str(uuid.uuid4())
+async def start_download(request: JobRequest):
+    """Starts a download job, or attaches to the one already downloading this module."""
+    # The job store may be SQLite; keep its queries off the event loop
+    job_id, created = await asyncio.to_thread(create_or_attach_job, str(uuid.uuid4()), request.module_code, job_owner())
     
-    create_job(job_id, request.module_code)
+    if not created:
+        job = await asyncio.to_thread(get_job, job_id)
+        return {"job_id": job_id, "status": job["status"], "attached": True}
     
-    background_tasks.add_task(background_download_task, job_id, request)
+    await submit_job(job_id, request)
     
-    return {"job_id": job_id, "status": "queued"}
+    return {"job_id": job_id, "status": "queued", "queue_position": await queue_position(job_id)}
+
+@router.get("/jobs")
+def get_jobs(status: Optional[str] = None, module_code: Optional[str] = None,
+             limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """Lists jobs, newest first."""
+    jobs, total = list_jobs(status, module_code, limit, offset)
+    return {"jobs": jobs, "total": total, "limit": limit, "offset": offset}
 
 @router.get("/jobs/{job_id}")
 async def get_job_status(job_id: str):
     """Checks the status of a job."""
-    job = get_job(job_id)
+    job = await asyncio.to_thread(get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    if job["status"] == "queued":
+        # In inline mode only known to the process that owns the job's queue
+        job = {**job, "queue_position": await queue_position(job_id)}
+    
     # If completed, ensure file list is up to date
     if job["status"] == "completed":
-        # Refresh file list just in case
-        job["files"] = get_generated_files(job["module_code"])
+        # From the module's file index, which is only re-read when it changed
+        file_info = await asyncio.to_thread(get_file_info, job["module_code"])
+        job = {**job, "files": [f["name"] for f in file_info], "file_info": file_info}
         
     return job
 
-@router.get("/files/{module_code}/{filename}")
-async def download_file(module_code: str, filename: str):
-    """Serves a generated PDF file."""
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}", f"data: {json.dumps(data)}"]
+    if event_id is not None:
+        lines.insert(0, f"id: {event_id}")
+    return "\n".join(lines) + "\n\n"
+
+async def _pushed_events(job_id: str, last_event_id: Optional[int]):
+    """Streams events published by jobs running in this process."""
+    replay, queue, complete = broker.subscribe(job_id, last_event_id)
+    try:
+        if not complete:
+            # Nothing to resume from: start with the current state
+            job = await asyncio.to_thread(get_job, job_id)
+            if not job:
+                return
+            yield _sse("progress", job["progress"])
+            yield _sse("status", job_status_event(job))
+            if job["status"] in FINISHED_STATUSES:
+                return
+            replay = []
+
+        for event_id, event, data in replay:
+            yield _sse(event, data, event_id)
+            if event == "status" and data["status"] in FINISHED_STATUSES:
+                return
+        job = await asyncio.to_thread(get_job, job_id)
+        if not job or job["status"] in FINISHED_STATUSES:
+            # Client already saw the end of the job
+            return
+
+        while True:
+            try:
+                event_id, event, data = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(event, data, event_id)
+            if event == "status" and data["status"] in FINISHED_STATUSES:
+                return
+    finally:
+        broker.unsubscribe(job_id, queue)
+
+async def _polled_events(job_id: str, last_event_id: Optional[int]):
+    """Streams changes of a job kept in a shared store; event ids are update times in ms."""
+    last_seen = last_event_id or 0
+    progress = status = None
+    last_write = time.monotonic()
+    while True:
+        job = await asyncio.to_thread(get_job, job_id)
+        if not job:
+            return
+        stamp = int(job["updated_at"] * 1000)
+        if stamp > last_seen:
+            last_seen = stamp
+            if job["progress"] != progress:
+                progress = job["progress"]
+                yield _sse("progress", progress, stamp)
+            if job["status"] != status:
+                status = job["status"]
+                yield _sse("status", job_status_event(job), stamp)
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= SSE_HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_write = time.monotonic()
+
+        if job["status"] in FINISHED_STATUSES:
+            return
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """Streams progress and status changes of a job as Server-Sent Events."""
+    if not await asyncio.to_thread(get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+
+    events = _pushed_events if PUBLISH_EVENTS else _polled_events
+    return StreamingResponse(
+        events(job_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/files/{module_code}.zip")
+def download_module_zip(module_code: str):
+    """Streams all PDFs of a module as one uncompressed ZIP archive."""
+    if ".." in module_code:
+        raise HTTPException(status_code=400, detail="Invalid path")
+
+    order = {doc: i for i, doc in enumerate(DOCUMENTS)}
+    module_dir = os.path.join("downloads", module_code)
+    # Settled before the response starts: a missing file cannot fail mid-archive
+    files = [
+        (f, os.path.join(module_dir, f))
+        for f in sorted(get_generated_files(module_code), key=lambda f: (order.get(f[:-4], len(order)), f))
+        if os.path.isfile(os.path.join(module_dir, f))
+    ]
+    if not files:
+        raise HTTPException(status_code=404, detail="No files found")
+
+    # A sync iterator: StreamingResponse reads the files in its thread pool
+    return StreamingResponse(
+        iter_zip(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{module_code}.zip"'}
+    )
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluates If-None-Match, or If-Modified-Since when no ETag was sent."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # Weak comparison, as RFC 9110 prescribes for If-None-Match
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@router.api_route("/files/{module_code}/{filename}", methods=["GET", "HEAD"])
+async def download_file(module_code: str, filename: str, request: Request):
+    """
+    Serves a generated PDF file with byte ranges (206, If-Range), HEAD and
+    conditional GET (304). The validators come from the file's stat data;
+    PDFs are replaced atomically, so a new file always gets a new ETag.
+    """
     # Security check: prevent traversal
     if ".." in module_code or ".." in filename:
         raise HTTPException(status_code=400, detail="Invalid path")
         
     file_path = os.path.join("downloads", module_code, filename)
     
-    if not os.path.exists(file_path):
+    try:
+        st = os.stat(file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="File not found")
-        
-    return FileResponse(file_path, media_type='application/pdf', filename=filename)
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {
+        "ETag": f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"',
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": f"public, max-age={FILE_CACHE_MAX_AGE}"
+    }
+    if _not_modified(request, headers["ETag"], st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse answers Range/If-Range requests and HEAD itself
+    return FileResponse(file_path, media_type='application/pdf', filename=filename,
+                        stat_result=st, headers=headers)
@@ -0,0 +1,193 @@
+"""
+Non-interactive batch downloader.
+
+Downloads many modules unattended. Modules come from the command line and/or
+a file with one module per line, optionally followed by its own PHPSESSID and
+Sucuri cookie (blank lines and # comments are ignored):
+
+    ADBI421103
+    EKMA4116 abcdef1234567890 sucuricp_tfca_6e453141ae697f9f78b18427b4c54df1=1
+
+    python -m app.batch --file modules.txt --phpsessid ... --sucuri-cookie ...
+    python download_images.py ADBI421103 EKMA4116 --concurrency 24
+
+All modules share one connection pool capped at --concurrency page requests.
+The next module starts downloading as soon as the current one only has PDFs
+left to merge (--parallel modules download at once). Progress is written to
+stdout as JSON lines; the exit status is the highest per-module exit code.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from typing import List, Optional, Tuple
+
+import httpx
+
+from app.core.config import HEADERS, BATCH_CONCURRENCY, BATCH_PARALLEL_MODULES, STREAM_TO_PDF
+from app.services.async_network import create_client
+from app.services.file_index import read_index
+
+# Per-module exit codes, also used for the process exit status (2 is argparse usage errors)
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_AUTH = 3       # cookies rejected (403)
+EXIT_INVALID = 4    # module code not found / not a valid module
+EXIT_NETWORK = 5    # upstream unreachable after retries
+
+class JsonLines:
+    """Writes one JSON object per line; safe to call from any thread."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, module: Optional[str] = None, **data):
+        record = {"event": event, "time": round(time.time(), 3)}
+        if module is not None:
+            record["module"] = module
+        record.update(data)
+        line = json.dumps(record)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def read_modules(path: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(module_code, phpsessid, sucuri_cookie) per line of `path` ('-' reads stdin)."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    modules = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        if len(parts) not in (1, 3):
+            raise ValueError(f"Expected 'MODULE [PHPSESSID SUCURI_COOKIE]', got: {line}")
+        modules.append((parts[0], parts[1], parts[2]) if len(parts) == 3 else (parts[0], None, None))
+    return modules
+
+def exit_code_for(error: BaseException) -> int:
+    if isinstance(error, PermissionError):
+        return EXIT_AUTH
+    if isinstance(error, ValueError):
+        return EXIT_INVALID
+    if isinstance(error, (httpx.TransportError, httpx.TimeoutException)):
+        return EXIT_NETWORK
+    return EXIT_FAILED
+
+async def run_batch(modules, output_root: str, concurrency: int = BATCH_CONCURRENCY,
+                    parallel: int = BATCH_PARALLEL_MODULES, stream_to_pdf: bool = STREAM_TO_PDF,
+                    out: Optional[JsonLines] = None, verbose: bool = False) -> int:
+    """Downloads `modules` (see read_modules) and returns the highest exit code."""
+    from download_images import download_images_async
+
+    out = out or JsonLines()
+    client = create_client(max_connections=concurrency, pool_timeout=None)
+    # Held while a module downloads pages; released once it is only merging
+    download_slots = asyncio.Semaphore(max(1, parallel))
+    codes = {}
+
+    async def run_module(module_code: str, phpsessid: str, sucuri_cookie: str):
+        released = False
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                download_slots.release()
+
+        await download_slots.acquire()
+        start = time.monotonic()
+        out.emit("start", module_code)
+
+        headers = HEADERS.copy()
+        headers['Referer'] = f'https://pustaka.ut.ac.id/reader/index.php?modul={module_code}'
+        headers['Cookie'] = f"PHPSESSID={phpsessid}; {sucuri_cookie}"
+
+        def progress(data):
+            out.emit("progress", module_code, **data)
+
+        def log(message):
+            if verbose:
+                out.emit("log", module_code, message=message.strip())
+
+        output_dir = os.path.join(output_root, module_code)
+        try:
+            await download_images_async(module_code, f"{module_code}/", output_dir, headers,
+                                        progress_callback=progress, log_callback=log, stream_to_pdf=stream_to_pdf,
+                                        client=client, downloads_done=release)
+            files = await asyncio.to_thread(read_index, output_dir)
+            codes[module_code] = EXIT_OK
+            out.emit("done", module_code, status="completed", exit_code=EXIT_OK,
+                     seconds=round(time.monotonic() - start, 2), files=[f["name"] for f in files])
+        except Exception as e:
+            codes[module_code] = exit_code_for(e)
+            out.emit("done", module_code, status="failed", exit_code=codes[module_code],
+                     seconds=round(time.monotonic() - start, 2), error=str(e) or type(e).__name__)
+        finally:
+            release()
+
+    try:
+        await asyncio.gather(*(run_module(*module) for module in modules))
+    finally:
+        await client.aclose()
+
+    failed = sorted(module_code for module_code, code in codes.items() if code != EXIT_OK)
+    out.emit("summary", modules=len(modules), completed=len(modules) - len(failed), failed=failed)
+    return max(codes.values(), default=EXIT_OK)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Download many RBV modules without prompts; progress is printed as JSON lines."
+    )
+    parser.add_argument("modules", nargs="*", help="module codes")
+    parser.add_argument("-f", "--file", help="file with one 'MODULE [PHPSESSID SUCURI_COOKIE]' per line ('-' for stdin)")
+    parser.add_argument("--phpsessid", default=os.environ.get("RBV_PHPSESSID"),
+                        help="default PHPSESSID (env RBV_PHPSESSID)")
+    parser.add_argument("--sucuri-cookie", default=os.environ.get("RBV_SUCURI_COOKIE"),
+                        help="default Sucuri cookie, e.g. sucuricp_tfca_...=1 (env RBV_SUCURI_COOKIE)")
+    parser.add_argument("-o", "--output-dir", default="downloads", help="modules are saved to OUTPUT_DIR/<module>")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="page requests in flight across all modules")
+    parser.add_argument("--parallel", type=int, default=BATCH_PARALLEL_MODULES,
+                        help="modules downloading pages at the same time")
+    parser.add_argument("--stream-to-pdf", action="store_true", default=STREAM_TO_PDF,
+                        help="append pages to the PDFs directly instead of staging images")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also emit log lines as 'log' events")
+    args = parser.parse_args(argv)
+
+    modules = [(code, None, None) for code in args.modules]
+    try:
+        if args.file:
+            modules += read_modules(args.file)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not modules:
+        parser.error("no module codes given")
+
+    resolved, seen = [], set()
+    for code, phpsessid, sucuri_cookie in modules:
+        phpsessid = phpsessid or args.phpsessid
+        sucuri_cookie = sucuri_cookie or args.sucuri_cookie
+        if not phpsessid or not sucuri_cookie:
+            parser.error(f"no cookies for {code}: pass --phpsessid/--sucuri-cookie or list them in the file")
+        # The same module twice would write to the same directory concurrently
+        if code not in seen:
+            seen.add(code)
+            resolved.append((code, phpsessid, sucuri_cookie))
+
+    try:
+        return asyncio.run(run_batch(resolved, args.output_dir, args.concurrency, args.parallel,
+                                     args.stream_to_pdf, verbose=args.verbose))
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
 # app/core/config.py
 
+import os
 import platform
 
-BASE_URL = "https://pustaka.ut.ac.id/reader/services/view.php"
+# RBV_BASE_URL points the downloader elsewhere, e.g. at benchmarks/mock_pustaka.py
+BASE_URL = os.environ.get("RBV_BASE_URL", "https://pustaka.ut.ac.id/reader/services/view.php")
 
 def get_headers():
     system = platform.system()
@@ -30,3 +32,140 @@ DOCUMENTS = [
     "TINJAUAN",
     "M1", "M2", "M3", "M4", "M5", "M6", "M7", "M8", "M9"
 ]
+
+# Maximum number of page requests kept in flight per document.
+# 1 restores the old strictly sequential behaviour.
+PAGE_CONCURRENCY = 4
+# Adapt the number of in-flight page requests to upstream (AIMD): start at
+# PAGE_CONCURRENCY, grow by one per window of fast answers, halve on
+# timeouts, 429 and 5xx. Answers slower than ADAPTIVE_LATENCY_TOLERANCE times
+# the best recent latency stop the growth.
+ADAPTIVE_CONCURRENCY = True
+PAGE_CONCURRENCY_MIN = 1
+PAGE_CONCURRENCY_MAX = 16
+ADAPTIVE_LATENCY_TOLERANCE = 2.0
+ADAPTIVE_DECREASE = 0.5
+# Hedged page requests: when a page has not answered within the
+# HEDGE_PERCENTILE of the last HEDGE_WINDOW latencies, a second identical
+# request is sent and the first answer wins. At most HEDGE_BUDGET extra
+# requests per request (HEDGE_BURST in a row) keep the added load bounded.
+HEDGE_REQUESTS = True
+HEDGE_PERCENTILE = 0.95
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+HEDGE_BUDGET = 0.05
+HEDGE_BURST = 5
+
+# Number of downloaded documents allowed to wait for the merge stage
+# before the download stage blocks.
+MERGE_QUEUE_SIZE = 2
+
+# Connection pool limits of the shared async HTTP client used by the API.
+ASYNC_MAX_CONNECTIONS = 64
+ASYNC_MAX_KEEPALIVE = 32
+
+# Find each document's page count up front with an exponential + binary
+# search so progress can be reported per page. Documents reaching
+# PROBE_MAX_PAGES count as unknown and are walked until their end.
+PROBE_PAGE_COUNTS = True
+PROBE_MAX_PAGES = 4096
+# A probe request failing with 5xx, 429 or a network error is retried this
+# many times (waiting PROBE_RETRY_DELAY * attempt seconds) before the
+# document's count is given up as unknown
+PROBE_RETRIES = 2
+PROBE_RETRY_DELAY = 0.5
+
+# Append every page to an incrementally written PDF as it arrives instead of
+# staging <doc>/<page>.jpg files and merging them afterwards.
+STREAM_TO_PDF = False
+
+# Worker processes used to merge independent documents in parallel.
+# 0 merges on the download pipeline's merge thread instead.
+MERGE_PROCESSES = 0
+
+# Page cache shared by API jobs: content-addressed blobs with LRU eviction.
+PAGE_CACHE_DIR = os.environ.get("RBV_PAGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".rbv_downloader_cache"))
+PAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# API job store: "memory" (per process) or "sqlite" (persistent, shared by
+# all uvicorn workers on the host).
+JOB_STORE_BACKEND = os.environ.get("RBV_JOB_STORE", "memory")
+JOB_STORE_PATH = os.environ.get("RBV_JOB_DB", "jobs.db")
+# Finished jobs are purged after this many seconds.
+JOB_TTL_SECONDS = 7 * 24 * 3600
+JOB_PURGE_INTERVAL = 3600
+# A "processing" job without progress for this long no longer blocks new
+# jobs for its module (its worker most likely died).
+JOB_STALE_SECONDS = 1800
+
+# API job scheduler: jobs running at once, jobs per upstream host, and
+# queue ordering ("priority" or "fifo"). Every job talks to BASE_URL, so
+# the lower of the first two is the real limit; keep them equal.
+SCHEDULER_WORKERS = 4
+SCHEDULER_PER_HOST = 4
+SCHEDULER_ORDERING = "priority"
+# Job priorities sent by clients are clamped to this range
+JOB_PRIORITY_MIN = -10
+JOB_PRIORITY_MAX = 10
+
+# "inline" runs API jobs inside the API process; "queue" only enqueues them
+# in the SQLite job database for `python -m app.worker` processes.
+EXECUTION_MODE = os.environ.get("RBV_EXECUTION_MODE", "inline")
+# Worker processes: jobs per worker, idle poll interval, and how long a
+# claimed job may go without a heartbeat before another worker takes it.
+WORKER_CONCURRENCY = 4
+QUEUE_POLL_INTERVAL = 1.0
+QUEUE_HEARTBEAT_INTERVAL = 30
+QUEUE_LEASE_SECONDS = 300
+
+# Server-Sent Events: progress events kept per job for Last-Event-ID replay,
+# how many jobs keep such a history, the keep-alive interval, and how often
+# the stream re-reads a shared (SQLite) job store for changes.
+JOB_EVENT_HISTORY = 256
+JOB_EVENT_MAX_JOBS = 1000
+SSE_HEARTBEAT_SECONDS = 15
+SSE_POLL_INTERVAL = 1.0
+
+# Page bodies are streamed to disk in chunks of this size
+PAGE_CHUNK_SIZE = 64 * 1024
+
+# Per-module resume manifest kept in the output directory
+MANIFEST_NAME = ".rbv_manifest.jsonl"
+# Per-module index of generated PDFs (name, size, mtime, sha256)
+FILE_INDEX_NAME = ".rbv_files.jsonl"
+
+# Cache-Control max-age for generated PDFs; clients revalidate with the
+# ETag/Last-Modified validators afterwards (a re-download replaces the file)
+FILE_CACHE_MAX_AGE = 86400
+# Read size when streaming module PDFs into a ZIP bundle
+ZIP_CHUNK_SIZE = 256 * 1024
+
+# /metrics: histogram buckets (seconds) for page fetch latency and PDF merge
+# time, and the window the pages/sec gauge averages over
+FETCH_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MERGE_DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+METRICS_RATE_WINDOW = 60
+# Processes sharing the SQLite job store (uvicorn --workers, app.worker)
+# write their metrics to this directory every export interval so /metrics can
+# add them up; snapshots older than the stale age are from dead processes
+METRICS_DIR = os.environ.get("RBV_METRICS_DIR", ".rbv_metrics" if JOB_STORE_BACKEND == "sqlite" else "")
+METRICS_EXPORT_INTERVAL = 5
+METRICS_EXPORT_STALE = 30
+
+# Progress events reach the CLI, GUI and job store at most once per interval
+# (seconds); throughput and ETA are smoothed with this EWMA weight
+PROGRESS_INTERVAL = 0.25
+PROGRESS_EWMA_ALPHA = 0.3
+
+# GUI log view: lines kept on screen, how often buffered lines are flushed
+# to it (ms), and the log file written to the download folder when enabled
+GUI_LOG_MAX_LINES = 2000
+GUI_LOG_FLUSH_MS = 100
+GUI_LOG_FILE_NAME = "rbv-downloader.log"
+
+# Batch CLI (python -m app.batch): page requests in flight across all modules
+# (the size of the shared connection pool) and modules downloading at once;
+# the next module starts as soon as the current one is only merging
+BATCH_CONCURRENCY = 16
+BATCH_PARALLEL_MODULES = 1
@@ -1,7 +1,57 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api.routes import router as api_router
+from app.core.config import JOB_PURGE_INTERVAL, JOB_STORE_BACKEND, EXECUTION_MODE
+from app.services.async_network import close_shared_client
+from app.services.job_store import purge_expired_jobs
+from app.services.metrics import render as render_metrics, start_export as start_metrics_export
+from app.services.tasks import scheduler, job_queue, fail_orphaned
 
-app = FastAPI(title="RBV Downloader API")
+async def purge_jobs_periodically():
+    """
+    Drops finished jobs older than JOB_TTL_SECONDS so the store stays bounded,
+    and (inline mode) fails jobs left behind by a stopped process, starting
+    with those of the previous run.
+    """
+    while True:
+        try:
+            removed = await asyncio.to_thread(purge_expired_jobs)
+            if removed:
+                logging.info(f"Purged {removed} expired jobs.")
+            if job_queue is None:
+                # Catches jobs of sibling uvicorn workers that died meanwhile
+                orphaned = await asyncio.to_thread(fail_orphaned)
+                if orphaned:
+                    logging.info(f"Failed {orphaned} jobs left behind by a stopped server process.")
+        except Exception as e:
+            logging.error(f"Job purge failed: {e}")
+        await asyncio.sleep(JOB_PURGE_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EXECUTION_MODE == "queue" and JOB_STORE_BACKEND != "sqlite":
+        raise RuntimeError("RBV_EXECUTION_MODE=queue needs RBV_JOB_STORE=sqlite so workers can report progress.")
+    start_metrics_export()
+    purger = asyncio.create_task(purge_jobs_periodically())
+    # Jobs run here unless they are handed to worker processes
+    if job_queue is None:
+        await scheduler.start()
+    yield
+    if job_queue is None:
+        await scheduler.stop()
+    purger.cancel()
+    # Release the connection pool shared by all download jobs
+    await close_shared_client()
+
+app = FastAPI(title="RBV Downloader API", lifespan=lifespan)
 
 # Register Routers
 app.include_router(api_router, prefix="/api")
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of the metrics of all API and worker processes."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
+from app.core.config import JOB_PRIORITY_MIN, JOB_PRIORITY_MAX
 
 class JobRequest(BaseModel):
     module_code: str
     phpsessid: str
     sucuri_cookie: str
+    # Higher runs first when the scheduler is busy
+    priority: int = 0
+
+    @field_validator("priority")
+    @classmethod
+    def _clamp_priority(cls, value: int) -> int:
+        return max(JOB_PRIORITY_MIN, min(JOB_PRIORITY_MAX, value))
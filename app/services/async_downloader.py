@@ -0,0 +1,384 @@
+import os
+import time
+import asyncio
+from typing import Optional, Callable, Dict
+import httpx
+
+from app.core.config import (
+    DOCUMENTS, PAGE_CONCURRENCY, MERGE_QUEUE_SIZE, PROBE_PAGE_COUNTS, PROBE_MAX_PAGES, STREAM_TO_PDF,
+    ADAPTIVE_CONCURRENCY, PAGE_CHUNK_SIZE, PROBE_RETRIES, PROBE_RETRY_DELAY
+)
+from app.services.async_network import AsyncNetworkService
+from app.services.pdf import PDFService
+from app.services.pdf_writer import JpegPdfWriter
+from app.services.logger import Logger
+from app.services.probe import PageCountProbe
+from app.services.page_cache import PageCache
+from app.services.manifest import ResumeManifest
+from app.services import metrics
+from app.services.downloader import ModuleDownloader, CachedPage, StagedPage, PAGE_SAVED, PAGE_END
+
+async def _file_call(func, *args):
+    """
+    Runs a blocking file step in a thread. A cancellation waits for the step
+    to finish, so a file is never closed, suspended or removed in the middle
+    of a write.
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        raise
+
+class AsyncModuleDownloader(ModuleDownloader):
+    """
+    asyncio version of ModuleDownloader. Page requests run on the event loop over
+    the shared connection pool; only the CPU-bound merge goes to a worker thread.
+    """
+
+    def __init__(self, network_service: AsyncNetworkService, pdf_service: PDFService,
+                 concurrency: int = PAGE_CONCURRENCY, probe: bool = PROBE_PAGE_COUNTS,
+                 stream_to_pdf: bool = STREAM_TO_PDF, cache: Optional[PageCache] = None,
+                 adaptive: bool = ADAPTIVE_CONCURRENCY):
+        super().__init__(network_service, pdf_service, concurrency=concurrency, probe=probe,
+                         stream_to_pdf=stream_to_pdf, cache=cache, adaptive=adaptive)
+
+    async def process(self, module_code: str, subfolder: str, output_dir: str,
+                      progress_callback: Optional[Callable[[Dict], None]] = None,
+                      log_callback: Optional[Callable[[str], None]] = None,
+                      stop_event=None, downloads_done: Optional[Callable[[], None]] = None):
+        """`downloads_done` is called once only merging is left (or the run ended early)."""
+        logger = Logger(log_callback)
+        self.module_code = module_code
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            logger.info(f"Created directory: {output_dir}")
+
+        self.manifest = ResumeManifest(output_dir)
+        self.progress = self._open_progress(progress_callback)
+        try:
+            await self._process_documents_async(subfolder, output_dir, progress_callback, logger, stop_event,
+                                                downloads_done)
+        finally:
+            self.progress.close()
+            self.manifest.close()
+
+    async def _process_documents_async(self, subfolder: str, output_dir: str, progress_callback, logger: Logger, stop_event,
+                                       downloads_done: Optional[Callable[[], None]] = None):
+        total_docs = len(DOCUMENTS)
+
+        if self.probe:
+            self._notify_progress(progress_callback, "processing", DOCUMENTS[0], "Probing page counts", 0, total_docs)
+            await self._validate_module_async(subfolder, logger)
+            page_counts = await self._probe_page_counts_async(subfolder, logger)
+        else:
+            page_counts = {doc: await asyncio.to_thread(self._known_page_count, doc) for doc in DOCUMENTS}
+        self._set_total_pages(page_counts, logger)
+
+        merge_queue = asyncio.Queue(maxsize=MERGE_QUEUE_SIZE)
+        merge_errors = []
+        merger = asyncio.create_task(
+            self._merge_stage_async(merge_queue, output_dir, total_docs, progress_callback, logger, merge_errors)
+        )
+
+        try:
+            for i, doc in enumerate(DOCUMENTS):
+                if stop_event and stop_event.is_set():
+                    logger.info(f"  [INFO] Download stopped by user.")
+                    return
+                if merge_errors:
+                    break
+
+                logger.info(f"Processing Document: {doc}")
+                if self._skip_finished(doc, output_dir, logger):
+                    continue
+                self._notify_progress(progress_callback, "processing", doc, "Starting download", i, total_docs)
+
+                if self.stream_to_pdf:
+                    await self._stream_document_async(doc, subfolder, output_dir, i, total_docs, progress_callback, logger,
+                                                      stop_event, page_count=page_counts.get(doc))
+                    continue
+
+                doc_dir = os.path.join(output_dir, doc)
+                if not os.path.exists(doc_dir):
+                    os.makedirs(doc_dir)
+
+                await self._download_document_pages_async(doc, subfolder, doc_dir, i, total_docs, progress_callback, logger, stop_event,
+                                                          page_count=page_counts.get(doc))
+                if stop_event and stop_event.is_set():
+                    logger.info(f"  [INFO] Download stopped by user.")
+                    return
+
+                await merge_queue.put((i, doc, doc_dir))
+        finally:
+            if downloads_done:
+                downloads_done()
+            await merge_queue.put(None)
+            await merger
+
+        if merge_errors:
+            raise merge_errors[0]
+
+    async def _merge_stage_async(self, merge_queue: asyncio.Queue, output_dir: str, total_docs: int,
+                                 progress_callback, logger: Logger, errors: list):
+        # With a process pool, up to `merge_processes` documents merge at once
+        slots = asyncio.Semaphore(max(1, self.pdf.merge_processes))
+        merges = []
+
+        async def merge(i, doc, doc_dir):
+            try:
+                self._notify_progress(progress_callback, "processing", doc, "Merging PDF", i, total_docs)
+                started = time.monotonic()
+                if self.pdf.merge_processes:
+                    try:
+                        messages, pdf_path = await asyncio.wrap_future(self.pdf.submit_merge(doc, doc_dir, output_dir))
+                    except Exception as e:
+                        logger.error(f"Failed to create PDF for {doc}: {e}")
+                        return
+                    for msg in messages:
+                        logger.info(msg)
+                else:
+                    pdf_path = await asyncio.to_thread(self.pdf.merge_images_to_pdf, doc, doc_dir, output_dir, logger)
+                self._record_pdf(doc, pdf_path, started)
+                await asyncio.to_thread(self._cleanup_document, doc, doc_dir, logger)
+                logger.info(f"Finished {doc}.\n")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+        while True:
+            item = await merge_queue.get()
+            if item is None:
+                break
+            if errors:
+                continue
+            await slots.acquire()
+            merges.append(asyncio.create_task(merge(*item)))
+
+        await asyncio.gather(*merges)
+
+    async def _stream_document_async(self, doc: str, subfolder: str, output_dir: str,
+                                     doc_index: int, total_docs: int,
+                                     progress_callback, logger: Logger, stop_event,
+                                     page_count: Optional[int] = None):
+        # Opening, appending and closing touch the disk (and hash the PDF); keep them off the loop
+        writer = await asyncio.to_thread(self.pdf.open_stream_writer, doc, output_dir)
+        if writer.page_count:
+            logger.info(f"  [RESUME] Continuing {doc} after page {writer.page_count}.")
+        try:
+            await self._download_document_pages_async(doc, subfolder, None, doc_index, total_docs, progress_callback, logger,
+                                                       stop_event, page_count=page_count, writer=writer)
+        except BaseException as e:
+            self._interrupt_stream_writer(writer, e)
+            raise
+        await _file_call(self._close_stream_writer, writer, doc, logger, stop_event)
+
+    async def _validate_module_async(self, subfolder: str, logger: Logger):
+        """Same early check as ModuleDownloader._validate_module."""
+        doc = DOCUMENTS[0]
+        if await asyncio.to_thread(self._known_page_count, doc) is not None:
+            return
+        start = time.monotonic()
+        try:
+            response = await self.network.fetch_page(doc, subfolder, 1, stream=True)
+        except (httpx.TransportError, httpx.TimeoutException):
+            self._record_fetch(None, time.monotonic() - start)
+            return
+        try:
+            self._record_fetch(response.status_code, time.monotonic() - start)
+            self._handle_response(response, doc, 1, 0, logger, lambda response: None)
+        finally:
+            await response.aclose()
+
+    async def _page_exists_async(self, doc: str, subfolder: str, page: int) -> bool:
+        """Same retries as ModuleDownloader._page_exists."""
+        for attempt in range(1, PROBE_RETRIES + 2):
+            try:
+                return await self.network.page_exists(doc, subfolder, page)
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if attempt > PROBE_RETRIES or (status != 429 and status < 500):
+                    raise
+                metrics.PAGE_RETRIES.inc(reason="status")
+            except (httpx.TransportError, httpx.TimeoutException):
+                if attempt > PROBE_RETRIES:
+                    raise
+                metrics.PAGE_RETRIES.inc(reason="network")
+            await asyncio.sleep(PROBE_RETRY_DELAY * attempt)
+
+    async def _probe_page_counts_async(self, subfolder: str, logger: Logger) -> Dict[str, Optional[int]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def probe_document(doc):
+            async with semaphore:
+                known = await asyncio.to_thread(self._known_page_count, doc)
+                if known is not None:
+                    return known
+
+                probe = PageCountProbe(PROBE_MAX_PAGES)
+                page = probe.next_page()
+                while page is not None:
+                    probe.record(page, await self._page_exists_async(doc, subfolder, page))
+                    page = probe.next_page()
+                return probe.count
+
+        results = await asyncio.gather(*(probe_document(doc) for doc in DOCUMENTS), return_exceptions=True)
+        counts = {}
+        for doc, result in zip(DOCUMENTS, results):
+            if isinstance(result, Exception):
+                logger.info(f"  [WARNING] Could not probe {doc}: {result}")
+                counts[doc] = None
+            else:
+                counts[doc] = result
+        return counts
+
+    async def _download_document_pages_async(self, doc: str, subfolder: str, doc_dir: str,
+                                             doc_index: int, total_docs: int,
+                                             progress_callback, logger: Logger, stop_event,
+                                             page_count: Optional[int] = None,
+                                             writer: Optional[JpegPdfWriter] = None):
+        """Same windowed, in-order walk as ModuleDownloader._download_document_pages."""
+        next_page = 1
+        if writer is not None:
+            next_page = writer.page_count + 1
+            self.pages_done += writer.page_count
+        # A count of 0 is trusted except for the first document, whose page 1
+        # response is what validates the module code and cookies
+        limit = page_count if page_count or doc_index > 0 else None
+        pending = {}  # page -> Task[Response]
+        abandoned = []
+        end_reached = False
+        consecutive_errors = 0
+
+        def submit(page):
+            pending[page] = asyncio.create_task(self._fetch_page_async(doc, subfolder, page, doc_dir))
+
+        try:
+            while True:
+                if stop_event and stop_event.is_set():
+                    break
+
+                while not end_reached and len(pending) < self._window():
+                    if limit is not None and next_page > limit:
+                        break
+                    if writer is None and self.manifest.has_page(doc, next_page, os.path.join(doc_dir, f"{next_page}.jpg")):
+                        self.pages_done += 1
+                        next_page += 1
+                        continue
+                    submit(next_page)
+                    next_page += 1
+
+                if not pending:
+                    if not end_reached:
+                        # Stopped at the known page count
+                        if limit:
+                            logger.info(f"  [INFO] Finished downloading {doc}.")
+                        else:
+                            logger.info(f"  [INFO] Document {doc} does not exist. Skipping.")
+                        self._remember_page_count(doc, limit)
+                    break
+
+                page = min(pending)
+                task = pending.pop(page)
+
+                self._notify_progress(progress_callback, "processing", doc, f"Downloading page {page}", doc_index, total_docs, page=page)
+
+                try:
+                    response = await task
+                    # Saving renames or writes the page (or appends and maybe re-encodes it)
+                    # and updates the manifest; pages still go in one at a time
+                    outcome = await _file_call(self._handle_response, response, doc, page, doc_index, logger,
+                                               self._page_sink(doc, doc_dir, page, writer))
+
+                    if outcome == PAGE_SAVED:
+                        self._page_saved()
+                        consecutive_errors = 0
+                    elif outcome == PAGE_END:
+                        end_reached = True
+                        self._remember_page_count(doc, page - 1)
+                        for t in pending.values():
+                            t.cancel()
+                        abandoned.extend(pending.values())
+                        pending.clear()
+                    else:
+                        consecutive_errors += 1
+                        metrics.PAGE_RETRIES.inc(reason="status")
+                        submit(page)
+
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    if isinstance(e, httpx.TimeoutException):
+                        msg = "Connection timed out."
+                    else:
+                        msg = "Network error. Check connection."
+
+                    logger.info(f"\n  [WARNING] {msg} Retrying...")
+                    consecutive_errors += 1
+                    if consecutive_errors > 3:
+                        metrics.PAGE_GIVE_UPS.inc()
+                        raise e
+                    metrics.PAGE_RETRIES.inc(reason="network")
+                    submit(page)
+                except Exception as e:
+                    if isinstance(e, (PermissionError, ValueError)): raise e
+                    logger.error(f"Unexpected error: {e}")
+                    consecutive_errors += 1
+                    metrics.PAGE_RETRIES.inc(reason="error")
+                    submit(page)
+
+                if consecutive_errors > 3:
+                    metrics.PAGE_GIVE_UPS.inc()
+                    logger.info(f"\n  [SKIP] Too many errors for {doc}. Moving next.")
+                    break
+        finally:
+            abandoned.extend(pending.values())
+            for t in abandoned:
+                t.cancel()
+            # Retrieve results so cancelled/failed requests are not reported as never awaited
+            await asyncio.gather(*abandoned, return_exceptions=True)
+
+    async def _fetch_page_async(self, doc: str, subfolder: str, page: int, doc_dir: Optional[str] = None):
+        if self.cache:
+            data = await asyncio.to_thread(self.cache.get, self.module_code, doc, page)
+            if data is not None:
+                return CachedPage(data)
+
+        start = time.monotonic()
+        try:
+            response = await self.network.fetch_page(doc, subfolder, page, stream=doc_dir is not None)
+            if doc_dir is not None:
+                response = await self._stage_page_async(response, doc_dir, page)
+        except (httpx.TransportError, httpx.TimeoutException):
+            self._record_fetch(None, time.monotonic() - start)
+            raise
+        self._record_fetch(response.status_code, time.monotonic() - start)
+        self._record_bytes(response)
+
+        if self.cache and self._is_image(response):
+            if isinstance(response, StagedPage):
+                await asyncio.to_thread(self.cache.put_file, self.module_code, doc, page,
+                                        response.path, response.sha256, response.size)
+            else:
+                await asyncio.to_thread(self.cache.put, self.module_code, doc, page, response.content)
+        return response
+
+    async def _stage_page_async(self, response: httpx.Response, doc_dir: str, page: int):
+        try:
+            if not self._is_image(response):
+                await response.aread()
+                return response
+
+            staged = await _file_call(StagedPage, response, os.path.join(doc_dir, f"{page}.jpg.part"))
+            try:
+                async for chunk in response.aiter_bytes(PAGE_CHUNK_SIZE):
+                    await _file_call(staged.write, chunk)
+            except BaseException:
+                staged.discard()
+                raise
+            if not await _file_call(staged.finish):
+                raise httpx.RemoteProtocolError(f"Page {page} ended after {staged.size} of {staged.expected} bytes.")
+            return staged
+        finally:
+            await response.aclose()
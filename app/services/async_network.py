@@ -0,0 +1,124 @@
+import time
+import asyncio
+import httpx
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, Optional, Tuple
+from app.core.config import BASE_URL, ASYNC_MAX_CONNECTIONS, ASYNC_MAX_KEEPALIVE, HEDGE_REQUESTS
+from app.services.hedging import Hedger
+from app.services import metrics
+
+_shared_client: Optional[httpx.AsyncClient] = None
+
+def create_client(max_connections: int = ASYNC_MAX_CONNECTIONS, max_keepalive: int = ASYNC_MAX_KEEPALIVE,
+                  pool_timeout: Optional[float] = 20) -> httpx.AsyncClient:
+    """
+    A client for many jobs at once. `max_connections` caps the requests in
+    flight across all of them; `pool_timeout` None lets requests wait for a
+    free connection as long as it takes.
+    """
+    # Jobs carry their own session cookies in the headers; the shared jar
+    # must never store Set-Cookie responses or they would leak between jobs.
+    jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(20, pool=pool_timeout),
+        cookies=jar,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_keepalive, max_connections)
+        )
+    )
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Returns the process-wide async client, creating it on first use."""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = create_client()
+    return _shared_client
+
+async def close_shared_client():
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+class AsyncNetworkService:
+    """Async counterpart of NetworkService running on a shared connection pool."""
+    
+    def __init__(self, headers: Dict[str, str], client: Optional[httpx.AsyncClient] = None,
+                 hedge: bool = HEDGE_REQUESTS):
+        self.client = client or get_shared_client()
+        self.headers = headers
+        self.hedger = Hedger() if hedge else None
+
+    async def fetch_page(self, doc: str, subfolder: str, page: int, stream: bool = False) -> httpx.Response:
+        """With `stream` the body is left unread; the caller must close the response."""
+        params = {
+            "doc": doc,
+            "format": "jpg",
+            "subfolder": subfolder,
+            "page": page
+        }
+        if not self.hedger:
+            return (await self._timed_get(params, stream))[0]
+        return await self._hedged_get(params, stream)
+
+    async def _timed_get(self, params: dict, stream: bool) -> Tuple[httpx.Response, float]:
+        start = time.monotonic()
+        request = self.client.build_request("GET", BASE_URL, params=params, headers=self.headers)
+        response = await self.client.send(request, stream=stream)
+        return response, time.monotonic() - start
+
+    async def _hedged_get(self, params: dict, stream: bool) -> httpx.Response:
+        """Races a second request against a slow first one; the loser is cancelled."""
+        delay = self.hedger.delay()
+        if delay is None:
+            response, elapsed = await self._timed_get(params, stream)
+            self.hedger.record(elapsed)
+            return response
+
+        pending = {asyncio.create_task(self._timed_get(params, stream))}
+        winner = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and self.hedger.allow_hedge():
+                pending.add(asyncio.create_task(self._timed_get(params, stream)))
+
+            error = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif winner is None:
+                        winner, elapsed = task.result()
+                        self.hedger.record(elapsed)
+                    else:
+                        # Both answered at once; drop the second stream
+                        await task.result()[0].aclose()
+            if winner is None:
+                raise error
+            return winner
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def page_exists(self, doc: str, subfolder: str, page: int) -> bool:
+        """Checks a page from its response headers only; the body is never read."""
+        params = {
+            "doc": doc,
+            "format": "jpg",
+            "subfolder": subfolder,
+            "page": page
+        }
+        start = time.monotonic()
+        try:
+            async with self.client.stream("GET", BASE_URL, params=params, headers=self.headers) as response:
+                metrics.PAGE_FETCH_SECONDS.observe(time.monotonic() - start, status=response.status_code)
+                # Only 404 means missing; a transient 5xx or 429 must not end the document early
+                if response.status_code != 404:
+                    response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '').lower()
+                return response.status_code == 200 and 'image' in content_type
+        except (httpx.TransportError, httpx.TimeoutException):
+            metrics.PAGE_FETCH_SECONDS.observe(time.monotonic() - start, status="error")
+            raise
@@ -0,0 +1,57 @@
+import time
+import threading
+from typing import Optional
+
+from app.core.config import (
+    PAGE_CONCURRENCY_MIN, PAGE_CONCURRENCY_MAX, ADAPTIVE_LATENCY_TOLERANCE, ADAPTIVE_DECREASE
+)
+
+# Weight of the newest sample in the latency average
+_LATENCY_ALPHA = 0.2
+# The latency baseline creeps up by this factor per sample, so a network that
+# became permanently slower is re-learned instead of blocking growth forever
+_BASELINE_DRIFT = 1.01
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for the number of page requests kept in flight.
+
+    Every upstream answer is reported with `on_success(latency)` or, for
+    timeouts, connection errors, 429 and 5xx, with `on_overload()`. While the
+    average latency stays within ADAPTIVE_LATENCY_TOLERANCE of the best seen,
+    the window grows by one per window of answers (additive increase). An
+    overload multiplies it by ADAPTIVE_DECREASE, at most once per round trip
+    since the requests already in flight fail for the same reason.
+    """
+
+    def __init__(self, initial: int, minimum: int = PAGE_CONCURRENCY_MIN, maximum: int = PAGE_CONCURRENCY_MAX):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self._window = float(min(max(initial, self.minimum), self.maximum))
+        self.latency: Optional[float] = None  # moving average, seconds
+        self.base_latency: Optional[float] = None
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> int:
+        return int(self._window)
+
+    def on_success(self, latency: float):
+        with self._lock:
+            if self.latency is None:
+                self.latency = self.base_latency = latency
+            else:
+                self.latency += _LATENCY_ALPHA * (latency - self.latency)
+                self.base_latency = min(self.latency, self.base_latency * _BASELINE_DRIFT)
+
+            if self.latency <= self.base_latency * ADAPTIVE_LATENCY_TOLERANCE:
+                self._window = min(self.maximum, self._window + 1 / self._window)
+
+    def on_overload(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_cut < (self.latency or 1.0):
+                return
+            self._last_cut = now
+            self._window = max(self.minimum, self._window * ADAPTIVE_DECREASE)
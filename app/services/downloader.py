@@ -1,143 +1,688 @@
 import os
+import time
+import queue
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from typing import Optional, Callable, Dict
-from requests.exceptions import ConnectionError, Timeout
+from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError, HTTPError
 
-from app.core.config import DOCUMENTS
+from app.core.config import (
+    DOCUMENTS, PAGE_CONCURRENCY, MERGE_QUEUE_SIZE, PROBE_PAGE_COUNTS, PROBE_MAX_PAGES, STREAM_TO_PDF,
+    ADAPTIVE_CONCURRENCY, PAGE_CHUNK_SIZE, PROBE_RETRIES, PROBE_RETRY_DELAY
+)
 from app.services.network import NetworkService
 from app.services.pdf import PDFService
+from app.services.pdf_writer import JpegPdfWriter
 from app.services.logger import Logger
+from app.services.probe import PageCountProbe
+from app.services.page_cache import PageCache
+from app.services.manifest import ResumeManifest
+from app.services.concurrency import AdaptiveConcurrency
+from app.services.progress import ProgressBus
+from app.services import metrics
+
+# Outcomes of a single page response, see ModuleDownloader._handle_response
+PAGE_SAVED = "saved"
+PAGE_END = "end"
+PAGE_RETRY = "retry"
+
+class CachedPage:
+    """Stands in for a network response when a page is served from the PageCache."""
+    status_code = 200
+    headers = {"Content-Type": "image/jpeg"}
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+class StagedPage:
+    """
+    Stands in for an image response whose body the fetching thread already
+    streamed to `<doc_dir>/<page>.jpg.part`; saving the page is a rename.
+    """
+
+    def __init__(self, response, path: str):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.path = path
+        self.size = 0
+        self.sha256 = None
+        length = response.headers.get("Content-Length", "")
+        # Content-Length counts encoded bytes, so it is only comparable without Content-Encoding
+        self.expected = int(length) if length.isdigit() and "Content-Encoding" not in response.headers else None
+        self._hash = hashlib.sha256()
+        self._file = open(path, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def finish(self) -> bool:
+        """Closes the file. Returns False (and removes it) if the body was cut short."""
+        self._file.close()
+        if self.expected is not None and self.size != self.expected:
+            self.discard()
+            return False
+        self.sha256 = self._hash.hexdigest()
+        return True
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 class ModuleDownloader:
     """Orchestrates the download, merging, and cleanup process."""
     
-    def __init__(self, network_service: NetworkService, pdf_service: PDFService):
+    def __init__(self, network_service: NetworkService, pdf_service: PDFService,
+                 concurrency: int = PAGE_CONCURRENCY, probe: bool = PROBE_PAGE_COUNTS,
+                 stream_to_pdf: bool = STREAM_TO_PDF, cache: Optional[PageCache] = None,
+                 adaptive: bool = ADAPTIVE_CONCURRENCY):
         self.network = network_service
         self.pdf = pdf_service
+        self.concurrency = max(1, concurrency)
+        # With `adaptive` the window starts at `concurrency` and follows upstream health
+        self.controller = AdaptiveConcurrency(self.concurrency) if adaptive else None
+        self.probe = probe
+        # Append pages straight to the document PDF instead of staging .jpg files
+        self.stream_to_pdf = stream_to_pdf
+        # Pages and page counts are looked up here before going upstream
+        self.cache = cache
+        self.module_code = None
+        # Resume manifest of the module being processed
+        self.manifest: Optional[ResumeManifest] = None
+        # Page-level progress of the current run
+        self.pages_done = 0
+        self.total_pages = None
+        self.progress: Optional[ProgressBus] = None
 
     def process(self, module_code: str, subfolder: str, output_dir: str, 
                 progress_callback: Optional[Callable[[Dict], None]] = None, 
                 log_callback: Optional[Callable[[str], None]] = None, 
                 stop_event=None):
-        
+        """
+        Runs the module as a two-stage pipeline: this thread downloads documents
+        one after another while a merge thread turns finished documents into PDFs
+        and cleans up their images, so document N+1 downloads while N is merged.
+        """
         logger = Logger(log_callback)
+        self.module_code = module_code
         
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
             logger.info(f"Created directory: {output_dir}")
 
+        self.manifest = ResumeManifest(output_dir)
+        self.progress = self._open_progress(progress_callback)
+        try:
+            self._process_documents(subfolder, output_dir, progress_callback, logger, stop_event)
+        finally:
+            self.progress.close()
+            self.manifest.close()
+
+    def _process_documents(self, subfolder: str, output_dir: str, progress_callback, logger: Logger, stop_event):
         total_docs = len(DOCUMENTS)
 
-        for i, doc in enumerate(DOCUMENTS):
-            if stop_event and stop_event.is_set():
-                logger.info(f"  [INFO] Download stopped by user.")
+        if self.probe:
+            self._notify_progress(progress_callback, "processing", DOCUMENTS[0], "Probing page counts", 0, total_docs)
+            self._validate_module(subfolder, logger)
+            page_counts = self._probe_page_counts(subfolder, logger)
+        else:
+            page_counts = {doc: self._known_page_count(doc) for doc in DOCUMENTS}
+        self._set_total_pages(page_counts, logger)
+
+        merge_queue = queue.Queue(maxsize=MERGE_QUEUE_SIZE)
+        merge_errors = []
+        merger = threading.Thread(
+            target=self._merge_stage,
+            args=(merge_queue, output_dir, total_docs, progress_callback, logger, merge_errors),
+            daemon=True
+        )
+        merger.start()
+
+        try:
+            for i, doc in enumerate(DOCUMENTS):
+                if stop_event and stop_event.is_set():
+                    logger.info(f"  [INFO] Download stopped by user.")
+                    return
+                if merge_errors:
+                    break
+
+                logger.info(f"Processing Document: {doc}")
+                if self._skip_finished(doc, output_dir, logger):
+                    continue
+                self._notify_progress(progress_callback, "processing", doc, "Starting download", i, total_docs)
+
+                if self.stream_to_pdf:
+                    self._stream_document(doc, subfolder, output_dir, i, total_docs, progress_callback, logger, stop_event,
+                                          page_count=page_counts.get(doc))
+                    continue
+
+                doc_dir = os.path.join(output_dir, doc)
+                if not os.path.exists(doc_dir):
+                    os.makedirs(doc_dir)
+
+                self._download_document_pages(doc, subfolder, doc_dir, i, total_docs, progress_callback, logger, stop_event,
+                                              page_count=page_counts.get(doc))
+                if stop_event and stop_event.is_set():
+                    # Keep the pages of the interrupted document for the next run
+                    logger.info(f"  [INFO] Download stopped by user.")
+                    return
+
+                # Hand over to the merge stage (blocks while the queue is full)
+                merge_queue.put((i, doc, doc_dir))
+        finally:
+            # Documents already downloaded are always merged before returning
+            merge_queue.put(None)
+            merger.join()
+
+        if merge_errors:
+            raise merge_errors[0]
+
+    def _merge_stage(self, merge_queue: queue.Queue, output_dir: str, total_docs: int,
+                     progress_callback, logger: Logger, errors: list):
+        """Consumes downloaded documents until the None sentinel arrives."""
+        if self.pdf.merge_processes:
+            self._pooled_merge_stage(merge_queue, output_dir, total_docs, progress_callback, logger, errors)
+            return
+
+        while True:
+            item = merge_queue.get()
+            if item is None:
                 return
+            if errors:
+                # A previous merge failed; keep draining so the producer never blocks
+                continue
 
-            doc_dir = os.path.join(output_dir, doc)
-            if not os.path.exists(doc_dir):
-                os.makedirs(doc_dir)
+            i, doc, doc_dir = item
+            try:
+                # Merge Phase
+                self._notify_progress(progress_callback, "processing", doc, "Merging PDF", i, total_docs)
+                started = time.monotonic()
+                self._record_pdf(doc, self.pdf.merge_images_to_pdf(doc, doc_dir, output_dir, logger), started)
+                
+                # Cleanup Phase
+                self._cleanup_document(doc, doc_dir, logger)
+                
+                logger.info(f"Finished {doc}.\n")
+            except Exception as e:
+                errors.append(e)
 
-            logger.info(f"Processing Document: {doc}")
-            self._notify_progress(progress_callback, "processing", doc, "Starting download", i, total_docs)
+    def _pooled_merge_stage(self, merge_queue: queue.Queue, output_dir: str, total_docs: int,
+                            progress_callback, logger: Logger, errors: list):
+        """Keeps up to `merge_processes` documents merging in parallel on the process pool."""
+        in_flight = {}  # Future -> ((index, doc, doc_dir), submit time)
+        input_done = False
 
-            self._download_document_pages(doc, subfolder, doc_dir, i, total_docs, progress_callback, logger, stop_event)
-            
-            # Merge Phase
-            self._notify_progress(progress_callback, "processing", doc, "Merging PDF", i, total_docs)
-            self.pdf.merge_images_to_pdf(doc, doc_dir, output_dir, logger)
-            
-            # Cleanup Phase
-            self.pdf.cleanup_images(doc_dir, logger)
-            
+        while not input_done or in_flight:
+            if in_flight:
+                # Block only once no more documents can arrive
+                done, _ = wait(list(in_flight), timeout=None if input_done else 0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, started = in_flight.pop(future)
+                    self._finish_pooled_merge(future, item, started, logger, errors)
+
+            if input_done or len(in_flight) >= self.pdf.merge_processes:
+                continue
+            try:
+                item = merge_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if item is None:
+                input_done = True
+            elif not errors:
+                i, doc, doc_dir = item
+                self._notify_progress(progress_callback, "processing", doc, "Merging PDF", i, total_docs)
+                # At most merge_processes are in flight, so submit time is start time
+                in_flight[self.pdf.submit_merge(doc, doc_dir, output_dir)] = (item, time.monotonic())
+
+    def _finish_pooled_merge(self, future: Future, item: tuple, started: float, logger: Logger, errors: list):
+        i, doc, doc_dir = item
+        try:
+            try:
+                messages, pdf_path = future.result()
+            except Exception as e:
+                # The worker process died; keep the images so a re-run can merge them
+                logger.error(f"Failed to create PDF for {doc}: {e}")
+                return
+
+            for msg in messages:
+                logger.info(msg)
+            self._record_pdf(doc, pdf_path, started)
+            self._cleanup_document(doc, doc_dir, logger)
             logger.info(f"Finished {doc}.\n")
+        except Exception as e:
+            errors.append(e)
+
+    def _stream_document(self, doc: str, subfolder: str, output_dir: str,
+                         doc_index: int, total_docs: int,
+                         progress_callback, logger: Logger, stop_event,
+                         page_count: Optional[int] = None):
+        """Appends pages to the document's PDF as they arrive; no merge stage is needed."""
+        writer = self.pdf.open_stream_writer(doc, output_dir)
+        if writer.page_count:
+            logger.info(f"  [RESUME] Continuing {doc} after page {writer.page_count}.")
+        try:
+            self._download_document_pages(doc, subfolder, None, doc_index, total_docs, progress_callback, logger, stop_event,
+                                          page_count=page_count, writer=writer)
+        except BaseException as e:
+            self._interrupt_stream_writer(writer, e)
+            raise
+        self._close_stream_writer(writer, doc, logger, stop_event)
+
+    @staticmethod
+    def _interrupt_stream_writer(writer: JpegPdfWriter, error: BaseException):
+        # Invalid module code or cookies (ValueError) leave nothing worth resuming
+        if isinstance(error, ValueError):
+            writer.abort()
+        else:
+            writer.suspend()
+
+    def _close_stream_writer(self, writer: JpegPdfWriter, doc: str, logger: Logger, stop_event):
+        if stop_event and stop_event.is_set():
+            # Keep the partial PDF and its checkpoint so the next run resumes it
+            writer.suspend()
+            return
+        started = time.monotonic()
+        self._record_pdf(doc, self.pdf.finish_stream_writer(writer, doc, logger), started)
+        logger.info(f"Finished {doc}.\n")
+
+    def _skip_finished(self, doc: str, output_dir: str, logger: Logger) -> bool:
+        """Skips a document an earlier run already finished, without any request."""
+        if not self.manifest.is_finished(doc, os.path.join(output_dir, f"{doc}.pdf")):
+            return False
+        count = self.manifest.page_count(doc)
+        if count:
+            self.pages_done += count
+            logger.info(f"  [RESUME] {doc} already finished ({count} pages). Skipping.")
+        else:
+            logger.info(f"  [RESUME] {doc} does not exist. Skipping.")
+        return True
+
+    def _cleanup_document(self, doc: str, doc_dir: str, logger: Logger):
+        # Pages of an incomplete document are kept so the next run only fetches the rest
+        if self.manifest.is_complete(doc):
+            self.pdf.cleanup_images(doc_dir, logger)
+        else:
+            logger.info(f"  [RESUME] Keeping downloaded pages of {doc} for the next run.")
+
+    def _record_pdf(self, doc: str, pdf_path: Optional[str], started: float):
+        """`started` is when producing the PDF began, for rbv_merge_seconds."""
+        if pdf_path:
+            metrics.MERGE_SECONDS.observe(time.monotonic() - started, doc=doc)
+        # A PDF only counts as finished if it holds every page of the document
+        if pdf_path and self.manifest.is_complete(doc):
+            self.manifest.record_pdf(doc, pdf_path)
+
+    def _validate_module(self, subfolder: str, logger: Logger):
+        """
+        Checks page 1 of the first document before probing, so an invalid module
+        code or expired cookies fail at once instead of after a probe of every
+        document. Only the headers are read; network errors are left to the probe.
+        """
+        doc = DOCUMENTS[0]
+        if self._known_page_count(doc) is not None:
+            return
+        start = time.monotonic()
+        try:
+            response = self.network.fetch_page(doc, subfolder, 1, stream=True)
+        except (ConnectionError, Timeout):
+            self._record_fetch(None, time.monotonic() - start)
+            return
+        try:
+            self._record_fetch(response.status_code, time.monotonic() - start)
+            # Raises ValueError / PermissionError exactly like the download would
+            self._handle_response(response, doc, 1, 0, logger, lambda response: None)
+        finally:
+            response.close()
+
+    def _probe_page_counts(self, subfolder: str, logger: Logger) -> Dict[str, Optional[int]]:
+        """Probes all documents in parallel. A document that cannot be probed maps to None."""
+        counts = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {doc: executor.submit(self._probe_document, doc, subfolder) for doc in DOCUMENTS}
+            for doc, future in futures.items():
+                try:
+                    counts[doc] = future.result()
+                except Exception as e:
+                    logger.info(f"  [WARNING] Could not probe {doc}: {e}")
+                    counts[doc] = None
+        return counts
+
+    def _probe_document(self, doc: str, subfolder: str) -> Optional[int]:
+        known = self._known_page_count(doc)
+        if known is not None:
+            return known
+
+        probe = PageCountProbe(PROBE_MAX_PAGES)
+        page = probe.next_page()
+        while page is not None:
+            probe.record(page, self._page_exists(doc, subfolder, page))
+            page = probe.next_page()
+        return probe.count
+
+    def _page_exists(self, doc: str, subfolder: str, page: int) -> bool:
+        """page_exists, retrying 5xx, 429 and network errors up to PROBE_RETRIES times."""
+        for attempt in range(1, PROBE_RETRIES + 2):
+            try:
+                return self.network.page_exists(doc, subfolder, page)
+            except HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if attempt > PROBE_RETRIES or (status != 429 and status < 500):
+                    raise
+                metrics.PAGE_RETRIES.inc(reason="status")
+            except (ConnectionError, Timeout):
+                if attempt > PROBE_RETRIES:
+                    raise
+                metrics.PAGE_RETRIES.inc(reason="network")
+            time.sleep(PROBE_RETRY_DELAY * attempt)
+
+    def _set_total_pages(self, page_counts: Dict[str, Optional[int]], logger: Logger):
+        # Only a complete probe gives a meaningful total
+        if page_counts and all(c is not None for c in page_counts.values()):
+            self.total_pages = sum(page_counts.values())
+            found = sum(1 for c in page_counts.values() if c)
+            logger.info(f"  [PROBE] Found {self.total_pages} pages in {found} documents.")
 
     def _download_document_pages(self, doc: str, subfolder: str, doc_dir: str, 
                                  doc_index: int, total_docs: int,
-                                 progress_callback, logger: Logger, stop_event):
-        page = 1
+                                 progress_callback, logger: Logger, stop_event,
+                                 page_count: Optional[int] = None,
+                                 writer: Optional[JpegPdfWriter] = None):
+        """
+        Downloads the pages of a document keeping up to `concurrency` requests in flight.
+        Responses are consumed strictly in page order, so the end of the document
+        (404 or non-image response) is detected exactly as in a sequential walk and
+        any requests issued past it are discarded. With a known `page_count`
+        (probed or cached) no request is issued past the last page. With a `writer` pages are appended
+        to the streamed PDF instead of being saved into `doc_dir`.
+        """
+        next_page = 1
+        if writer is not None:
+            # Pages already in a resumed PDF
+            next_page = writer.page_count + 1
+            self.pages_done += writer.page_count
+        # A count of 0 is trusted except for the first document, whose page 1
+        # response is what validates the module code and cookies
+        limit = page_count if page_count or doc_index > 0 else None
+        pending = {}  # page -> Future[Response]
+        end_reached = False
         consecutive_errors = 0
 
-        while True:
-            if stop_event and stop_event.is_set():
-                break
-
-            filename = os.path.join(doc_dir, f"{page}.jpg")
-            
-            # Skip if exists
-            if os.path.exists(filename):
-                page += 1
-                continue
-            
-            # CLI Feedback (only if no logger callback is active, strictly for CLI feel if needed)
-            # But we should rely on logger or progress callback
-            if not logger.callback:
-                 print(f"  [DOWNLOADING] Page {page}...", end="\r")
+        max_window = self.controller.maximum if self.controller else self.concurrency
+        executor = ThreadPoolExecutor(max_workers=max_window)
+        try:
+            while True:
+                if stop_event and stop_event.is_set():
+                    break
 
-            self._notify_progress(progress_callback, "processing", doc, f"Downloading page {page}", doc_index, total_docs)
+                # Keep the window full
+                while not end_reached and len(pending) < self._window():
+                    if limit is not None and next_page > limit:
+                        break
+                    # Skip pages an earlier run saved completely
+                    if writer is None and self.manifest.has_page(doc, next_page, os.path.join(doc_dir, f"{next_page}.jpg")):
+                        self.pages_done += 1
+                        next_page += 1
+                        continue
+                    pending[next_page] = executor.submit(self._fetch_page, doc, subfolder, next_page, doc_dir)
+                    next_page += 1
 
-            try:
-                response = self.network.fetch_page(doc, subfolder, page)
-                
-                if response.status_code == 200:
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    if 'image' in content_type:
-                        with open(filename, "wb") as f:
-                            f.write(response.content)
+                if not pending:
+                    if not end_reached:
+                        # Stopped at the known page count
+                        if limit:
+                            logger.info(f"  [INFO] Finished downloading {doc}.")
+                        else:
+                            logger.info(f"  [INFO] Document {doc} does not exist. Skipping.")
+                        self._remember_page_count(doc, limit)
+                    break
+
+                page = min(pending)
+                future = pending.pop(page)
+
+                # CLI Feedback (only if no logger callback is active, strictly for CLI feel if needed)
+                # But we should rely on logger or progress callback
+                if not logger.callback:
+                     print(f"  [DOWNLOADING] Page {page}...", end="\r")
+
+                self._notify_progress(progress_callback, "processing", doc, f"Downloading page {page}", doc_index, total_docs, page=page)
+
+                try:
+                    response = future.result()
+                    outcome = self._handle_response(response, doc, page, doc_index, logger,
+                                                    self._page_sink(doc, doc_dir, page, writer))
+
+                    if outcome == PAGE_SAVED:
+                        self._page_saved()
                         consecutive_errors = 0
-                        page += 1
+                    elif outcome == PAGE_END:
+                        end_reached = True
+                        self._remember_page_count(doc, page - 1)
+                        # Everything issued past the last page is irrelevant
+                        for f in pending.values():
+                            f.cancel()
+                        pending.clear()
                     else:
-                        # Critical Check: If the very first page of the first document is not an image,
-                        # the inputs are definitely wrong (likely redirected to login or error page).
-                        if doc_index == 0 and page == 1:
-                            logger.error("Server returned HTML instead of Image. Inputs are likely invalid.")
-                            raise ValueError("Invalid Module Code or Cookies. (Server returned text/html)")
+                        consecutive_errors += 1
+                        metrics.PAGE_RETRIES.inc(reason="status")
+                        pending[page] = executor.submit(self._fetch_page, doc, subfolder, page, doc_dir)
 
-                        logger.info(f"  [INFO] Page {page} reached end (Content-Type: {content_type}).")
-                        break
-                
-                elif response.status_code == 403:
-                    msg = "Authentication failed. Cookies expired."
-                    logger.error(msg)
-                    raise PermissionError(msg)
-                
-                elif response.status_code == 404:
-                    if page == 1:
-                        # Critical Check: If the first standard document (DAFIS) is missing, warn the user.
-                        if doc_index == 0:
-                             logger.error("First document not found.")
-                             raise ValueError("Module Code likely invalid (DAFIS not found).")
-                        logger.info(f"  [INFO] Document {doc} does not exist. Skipping.")
+                except (ConnectionError, Timeout) as e:
+                    if isinstance(e, ConnectionError):
+                        msg = "Network error. Check connection."
                     else:
-                        logger.info(f"  [INFO] Finished downloading {doc}.")
-                    break
-                else:
-                    logger.info(f"  [FAILED] Page {page} returned status: {response.status_code}")
+                        msg = "Connection timed out."
+                    
+                    logger.info(f"\n  [WARNING] {msg} Retrying...")
                     consecutive_errors += 1
-
-            except (ConnectionError, Timeout) as e:
-                if isinstance(e, ConnectionError):
-                    msg = "Network error. Check connection."
-                else:
-                    msg = "Connection timed out."
+                    if consecutive_errors > 3:
+                        metrics.PAGE_GIVE_UPS.inc()
+                        raise e
+                    metrics.PAGE_RETRIES.inc(reason="network")
+                    pending[page] = executor.submit(self._fetch_page, doc, subfolder, page, doc_dir)
+                except Exception as e:
+                    if isinstance(e, (PermissionError, ValueError)): raise e
+                    logger.error(f"Unexpected error: {e}")
+                    consecutive_errors += 1
+                    metrics.PAGE_RETRIES.inc(reason="error")
+                    pending[page] = executor.submit(self._fetch_page, doc, subfolder, page, doc_dir)
                 
-                logger.info(f"\n  [WARNING] {msg} Retrying...")
-                consecutive_errors += 1
                 if consecutive_errors > 3:
-                    raise e
-            except Exception as e:
-                if isinstance(e, (PermissionError, ValueError)): raise e
-                logger.error(f"Unexpected error: {e}")
-                consecutive_errors += 1
-            
-            if consecutive_errors > 3:
-                logger.info(f"\n  [SKIP] Too many errors for {doc}. Moving next.")
-                break
-
-    def _notify_progress(self, callback, status, doc, msg, idx, total):
+                    metrics.PAGE_GIVE_UPS.inc()
+                    logger.info(f"\n  [SKIP] Too many errors for {doc}. Moving next.")
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_page(self, doc: str, subfolder: str, page: int, doc_dir: Optional[str] = None):
+        """
+        Serves a page from the cache when possible; image responses are added to it.
+        With a `doc_dir` the image body is streamed into it (see StagedPage).
+        """
+        if self.cache:
+            data = self.cache.get(self.module_code, doc, page)
+            if data is not None:
+                return CachedPage(data)
+
+        start = time.monotonic()
+        try:
+            response = self.network.fetch_page(doc, subfolder, page, stream=doc_dir is not None)
+            if doc_dir is not None:
+                response = self._stage_page(response, doc_dir, page)
+        except (ConnectionError, Timeout):
+            self._record_fetch(None, time.monotonic() - start)
+            raise
+        self._record_fetch(response.status_code, time.monotonic() - start)
+        self._record_bytes(response)
+
+        if self.cache and self._is_image(response):
+            if isinstance(response, StagedPage):
+                self.cache.put_file(self.module_code, doc, page, response.path, response.sha256, response.size)
+            else:
+                self.cache.put(self.module_code, doc, page, response.content)
+        return response
+
+    def _stage_page(self, response, doc_dir: str, page: int):
+        """Streams an image body to disk in chunks; other (small) bodies are read as before."""
+        try:
+            if not self._is_image(response):
+                response.content
+                return response
+
+            staged = StagedPage(response, os.path.join(doc_dir, f"{page}.jpg.part"))
+            try:
+                for chunk in response.iter_content(PAGE_CHUNK_SIZE):
+                    staged.write(chunk)
+            except ChunkedEncodingError as e:
+                # Connection dropped mid-body; retried like any network error
+                staged.discard()
+                raise ConnectionError(e)
+            except BaseException:
+                staged.discard()
+                raise
+            if not staged.finish():
+                raise ConnectionError(f"Page {page} ended after {staged.size} of {staged.expected} bytes.")
+            return staged
+        finally:
+            response.close()
+
+    def _window(self) -> int:
+        """Number of page requests to keep in flight right now."""
+        return self.controller.window if self.controller else self.concurrency
+
+    def _record_fetch(self, status_code: Optional[int], latency: float):
+        """Feeds an upstream answer (None for a network error) to the metrics and the controller."""
+        metrics.PAGE_FETCH_SECONDS.observe(latency, status="error" if status_code is None else status_code)
+        if not self.controller:
+            return
+        if status_code is None or status_code == 429 or status_code >= 500:
+            self.controller.on_overload()
+        else:
+            self.controller.on_success(latency)
+
+    def _record_bytes(self, response):
+        if self._is_image(response):
+            size = response.size if isinstance(response, StagedPage) else len(response.content)
+            metrics.DOWNLOADED_BYTES.inc(size)
+            self.progress.add(nbytes=size)
+
+    def _page_saved(self):
+        self.pages_done += 1
+        metrics.record_page()
+        self.progress.add(pages=1)
+
+    def _known_page_count(self, doc: str) -> Optional[int]:
+        """Page count recorded by an earlier run of this module, if any."""
+        count = self.manifest.page_count(doc)
+        if count is None and self.cache:
+            count = self.cache.get_page_count(self.module_code, doc)
+        return count
+
+    def _remember_page_count(self, doc: str, count: int):
+        # Only called once the walk has seen the real end of the document
+        self.manifest.record_page_count(doc, count)
+        if self.cache:
+            self.cache.put_page_count(self.module_code, doc, count)
+
+    @staticmethod
+    def _is_image(response) -> bool:
+        return response.status_code == 200 and 'image' in response.headers.get('Content-Type', '').lower()
+
+    def _page_sink(self, doc: str, doc_dir: Optional[str], page: int,
+                   writer: Optional[JpegPdfWriter]) -> Callable[..., None]:
+        """
+        Where an image response goes: the streamed PDF or `<doc_dir>/<page>.jpg`.
+        The file only appears under its final name once complete, and the page
+        is recorded in the manifest once it is written.
+        """
+        if writer is not None:
+            def append(response):
+                data = response.content
+                self.pdf.append_page(writer, data)
+                self.manifest.record_page(doc, page, len(data), hashlib.sha256(data).hexdigest())
+            return append
+
+        filename = os.path.join(doc_dir, f"{page}.jpg")
+        def save(response):
+            if isinstance(response, StagedPage):
+                os.replace(response.path, filename)
+                self.manifest.record_page(doc, page, response.size, response.sha256)
+                return
+
+            # Served from the cache
+            data = response.content
+            with open(filename + ".part", "wb") as f:
+                f.write(data)
+            os.replace(filename + ".part", filename)
+            self.manifest.record_page(doc, page, len(data), hashlib.sha256(data).hexdigest())
+        return save
+
+    def _handle_response(self, response, doc: str, page: int, doc_index: int,
+                         logger: Logger, save: Callable[..., None]) -> str:
+        """Saves an image response and classifies it as PAGE_SAVED, PAGE_END or PAGE_RETRY."""
+        if response.status_code == 200:
+            content_type = response.headers.get('Content-Type', '').lower()
+            if 'image' in content_type:
+                save(response)
+                return PAGE_SAVED
+
+            # Critical Check: If the very first page of the first document is not an image,
+            # the inputs are definitely wrong (likely redirected to login or error page).
+            if doc_index == 0 and page == 1:
+                logger.error("Server returned HTML instead of Image. Inputs are likely invalid.")
+                raise ValueError("Invalid Module Code or Cookies. (Server returned text/html)")
+
+            logger.info(f"  [INFO] Page {page} reached end (Content-Type: {content_type}).")
+            return PAGE_END
+
+        if response.status_code == 403:
+            msg = "Authentication failed. Cookies expired."
+            logger.error(msg)
+            raise PermissionError(msg)
+
+        if response.status_code == 404:
+            if page == 1:
+                # Critical Check: If the first standard document (DAFIS) is missing, warn the user.
+                if doc_index == 0:
+                     logger.error("First document not found.")
+                     raise ValueError("Module Code likely invalid (DAFIS not found).")
+                logger.info(f"  [INFO] Document {doc} does not exist. Skipping.")
+            else:
+                logger.info(f"  [INFO] Finished downloading {doc}.")
+            return PAGE_END
+
+        logger.info(f"  [FAILED] Page {page} returned status: {response.status_code}")
+        return PAGE_RETRY
+
+    def _open_progress(self, progress_callback) -> ProgressBus:
+        bus = ProgressBus(self._progress_data)
+        if progress_callback:
+            bus.subscribe(progress_callback)
+        return bus
+
+    def _notify_progress(self, callback, status, doc, msg, idx, total, page=None):
+        # Cheap enough to call per page: the bus decides which events go out
         if callback:
-            callback({
-                "status": status,
-                "doc": doc,
-                "message": msg,
-                "current_doc_index": idx,
-                "total_docs": total
-            })
+            self.progress.publish(status, doc, msg, idx, total, page)
+
+    def _progress_data(self, status, doc, msg, idx, total, page=None) -> Dict:
+        data = {
+            "status": status,
+            "doc": doc,
+            "message": msg,
+            "current_doc_index": idx,
+            "total_docs": total,
+            "pages_done": self.pages_done
+        }
+        if page is not None:
+            data["page"] = page
+        if self.total_pages is not None:
+            data["total_pages"] = self.total_pages
+        if self.controller:
+            data["window"] = self.controller.window
+            if self.controller.latency is not None:
+                data["latency_ms"] = round(self.controller.latency * 1000)
+        return data
@@ -0,0 +1,127 @@
+"""
+Index of the PDFs in a module's output directory, kept in
+`<output_dir>/.rbv_files.jsonl` with one entry (name, size, mtime, sha256)
+per line. PDFService appends an entry whenever it publishes a PDF; the last
+entry for a name wins. Lines are short single writes in append mode, so
+merges in other processes (process pool, queue workers) can add to it too.
+
+Readers keep the parsed index in memory and only re-read it when the file
+changed. Every read checks the entries against the PDFs on disk (one
+listdir and a stat per file): entries of deleted or replaced files are
+dropped or described again, PDFs missing from the index are added, and the
+index is rewritten. The rewrite may swallow an append racing with it; the
+next read finds that PDF unindexed and adds it back.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Any, List, Tuple
+
+from app.core.config import FILE_INDEX_NAME
+
+_CHUNK_SIZE = 1024 * 1024
+
+_cache: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+_cache_lock = threading.Lock()
+
+def _describe(path: str) -> Dict[str, Any]:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    st = os.stat(path)
+    return {
+        "name": os.path.basename(path),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": digest.hexdigest()
+    }
+
+def record_file(output_dir: str, path: str):
+    """Adds a freshly written PDF to the index of `output_dir`."""
+    index_path = os.path.join(output_dir, FILE_INDEX_NAME)
+    if not os.path.exists(index_path):
+        # First indexed file here: pick up PDFs written before the index existed
+        rebuild_index(output_dir)
+        return
+    with open(index_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_describe(path)) + "\n")
+
+def _write_index(output_dir: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    index_path = os.path.join(output_dir, FILE_INDEX_NAME)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    os.replace(tmp_path, index_path)
+    return entries
+
+def rebuild_index(output_dir: str) -> List[Dict[str, Any]]:
+    """Scans `output_dir` for PDFs and rewrites its index."""
+    entries = [_describe(os.path.join(output_dir, name)) for name in _pdf_names(output_dir)]
+    return _write_index(output_dir, entries)
+
+def _matches(output_dir: str, entry: Dict[str, Any]) -> bool:
+    try:
+        st = os.stat(os.path.join(output_dir, entry["name"]))
+    except OSError:
+        return False
+    return st.st_size == entry.get("size") and st.st_mtime == entry.get("mtime")
+
+def _pdf_names(output_dir: str) -> List[str]:
+    return sorted(name for name in os.listdir(output_dir) if name.endswith(".pdf"))
+
+def _refresh(output_dir: str, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rewrites the index from the PDFs on disk, describing only new or changed ones."""
+    known = {entry["name"]: entry for entry in files}
+    entries = []
+    for name in _pdf_names(output_dir):
+        entry = known.get(name)
+        if entry is not None and _matches(output_dir, entry):
+            entries.append(entry)
+            continue
+        try:
+            entries.append(_describe(os.path.join(output_dir, name)))
+        except FileNotFoundError:
+            continue
+    return _write_index(output_dir, entries)
+
+def read_index(output_dir: str) -> List[Dict[str, Any]]:
+    """Returns the indexed PDFs of `output_dir` sorted by name ([] if it does not exist)."""
+    index_path = os.path.join(output_dir, FILE_INDEX_NAME)
+    try:
+        st = os.stat(index_path)
+    except FileNotFoundError:
+        if not os.path.isdir(output_dir):
+            return []
+        rebuild_index(output_dir)
+        st = os.stat(index_path)
+
+    version = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        cached = _cache.get(index_path)
+    if cached and cached[0] == version:
+        files = cached[1]
+    else:
+        entries = {}
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entries[entry["name"]] = entry
+                except (ValueError, KeyError, TypeError):
+                    # Torn line of a writer that is still appending
+                    continue
+        files = [entries[name] for name in sorted(entries)]
+
+    names = [entry["name"] for entry in files]
+    if names != _pdf_names(output_dir) or not all(_matches(output_dir, entry) for entry in files):
+        # PDFs deleted, replaced or added behind the index's back
+        files = _refresh(output_dir, files)
+        st = os.stat(index_path)
+        version = (st.st_mtime_ns, st.st_size)
+
+    with _cache_lock:
+        _cache[index_path] = (version, files)
+    return files
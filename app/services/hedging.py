@@ -0,0 +1,51 @@
+import threading
+from collections import deque
+from typing import Optional
+
+from app.core.config import (
+    HEDGE_PERCENTILE, HEDGE_WINDOW, HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY, HEDGE_BUDGET, HEDGE_BURST
+)
+
+class Hedger:
+    """
+    Decides when a page request gets a hedge (a second identical request).
+
+    Tracks the latency of the last HEDGE_WINDOW answers; a request still
+    unanswered after their HEDGE_PERCENTILE may be hedged. Each request earns
+    HEDGE_BUDGET of a token (up to HEDGE_BURST) and each hedge spends one,
+    so hedges never exceed that share of the traffic.
+    """
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, window: int = HEDGE_WINDOW,
+                 budget: float = HEDGE_BUDGET, burst: float = HEDGE_BURST):
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self._samples = deque(maxlen=window)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+
+    def delay(self) -> Optional[float]:
+        """Counts a new request and returns how long to wait before hedging it (None: never)."""
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(HEDGE_MIN_DELAY, ordered[index])
+
+    def allow_hedge(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from collections import deque, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import JOB_EVENT_HISTORY, JOB_EVENT_MAX_JOBS
+
+# (event id, event type, data)
+JobEvent = Tuple[int, str, Dict[str, Any]]
+
+class JobEventBroker:
+    """
+    Fans job events out to Server-Sent Events streams in this process.
+
+    Events may be published from any thread (sync download tasks run in the
+    thread pool). The last JOB_EVENT_HISTORY events of each job are kept so a
+    reconnecting client can resume after its Last-Event-ID; the histories of
+    the least recently active jobs are dropped beyond JOB_EVENT_MAX_JOBS.
+    """
+
+    def __init__(self, history: int = JOB_EVENT_HISTORY, max_jobs: int = JOB_EVENT_MAX_JOBS):
+        self.history = history
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._events: "OrderedDict[str, deque]" = OrderedDict()
+        self._last_id: Dict[str, int] = {}
+        self._subscribers: Dict[str, set] = {}  # job_id -> {(loop, asyncio.Queue)}
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]):
+        with self._lock:
+            event_id = self._last_id.get(job_id, 0) + 1
+            self._last_id[job_id] = event_id
+            item = (event_id, event, data)
+
+            events = self._events.pop(job_id, None) or deque(maxlen=self.history)
+            events.append(item)
+            self._events[job_id] = events
+            while len(self._events) > self.max_jobs:
+                old_job, _ = self._events.popitem(last=False)
+                self._last_id.pop(old_job, None)
+
+            subscribers = list(self._subscribers.get(job_id, ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+    def subscribe(self, job_id: str, last_event_id: Optional[int] = None) -> Tuple[List[JobEvent], asyncio.Queue, bool]:
+        """
+        Registers a stream for `job_id`. Returns the buffered events after
+        `last_event_id`, the queue live events arrive on, and whether that
+        replay is complete (False when older events were already dropped).
+        """
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add((asyncio.get_running_loop(), queue))
+            buffered = list(self._events.get(job_id, ()))
+
+        if last_event_id is None:
+            return [], queue, False
+        replay = [e for e in buffered if e[0] > last_event_id]
+        if buffered:
+            complete = buffered[0][0] <= last_event_id + 1 and last_event_id <= buffered[-1][0]
+        else:
+            complete = last_event_id == 0
+        return replay, queue, complete
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is None:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del self._subscribers[job_id]
+
+
+broker = JobEventBroker()
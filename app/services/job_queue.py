@@ -0,0 +1,99 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Tuple, Optional
+
+from app.core.config import JOB_STORE_PATH, QUEUE_LEASE_SECONDS
+
+class DurableJobQueue:
+    """
+    Job queue in the SQLite job database. The API process enqueues, worker
+    processes claim. A claim is a lease kept alive by heartbeats; when a worker
+    dies its jobs become claimable again after QUEUE_LEASE_SECONDS.
+
+    Payloads contain the job's cookies and are deleted as soon as the job ends.
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_queue ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT UNIQUE NOT NULL, payload TEXT NOT NULL, "
+            "priority INTEGER NOT NULL DEFAULT 0, enqueued_at REAL NOT NULL, "
+            "claimed_by TEXT, heartbeat REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS job_queue_order ON job_queue (claimed_by, priority DESC, seq)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any], priority: int = 0):
+        self._conn().execute(
+            "INSERT INTO job_queue (job_id, payload, priority, enqueued_at) VALUES (?, ?, ?, ?)",
+            (job_id, json.dumps(payload), priority, time.time())
+        )
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Takes the next waiting job (or one whose lease expired). Returns (job_id, payload)."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT job_id, payload FROM job_queue WHERE claimed_by IS NULL OR heartbeat < ? "
+                "ORDER BY claimed_by IS NOT NULL, priority DESC, seq LIMIT 1",
+                (now - QUEUE_LEASE_SECONDS,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE job_queue SET claimed_by = ?, heartbeat = ? WHERE job_id = ?",
+                    (worker_id, now, row[0])
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def heartbeat(self, job_ids: List[str]):
+        now = time.time()
+        self._conn().executemany(
+            "UPDATE job_queue SET heartbeat = ? WHERE job_id = ?", [(now, job_id) for job_id in job_ids]
+        )
+
+    def release(self, job_id: str):
+        """Hands a claimed job back so the next claim takes it again."""
+        self._conn().execute(
+            "UPDATE job_queue SET claimed_by = NULL, heartbeat = NULL WHERE job_id = ?", (job_id,)
+        )
+
+    def complete(self, job_id: str):
+        self._conn().execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position among waiting jobs, or None once the job was claimed."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT seq, priority FROM job_queue WHERE job_id = ? AND claimed_by IS NULL", (job_id,)
+        ).fetchone()
+        if not row:
+            return None
+        seq, priority = row
+        return conn.execute(
+            "SELECT COUNT(*) FROM job_queue WHERE claimed_by IS NULL "
+            "AND (priority > ? OR (priority = ? AND seq <= ?))",
+            (priority, priority, seq)
+        ).fetchone()[0]
+
+    def depth(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM job_queue WHERE claimed_by IS NULL").fetchone()[0]
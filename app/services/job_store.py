@@ -1,45 +1,184 @@
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Tuple, Optional
 import os
+import time
+import threading
+
+from app.core.config import JOB_STORE_BACKEND, JOB_STORE_PATH, JOB_TTL_SECONDS
+from app.services.job_events import broker
+from app.services.file_index import read_index
+from app.services import metrics
+
+# Statuses of a job that still owns its module's download
+ACTIVE_STATUSES = ("queued", "processing")
+FINISHED_STATUSES = ("completed", "failed")
 
 # In-memory storage for job status
 # Format: { "job_id": { "status": "...", "progress": {...}, "result": [...] } }
 JOBS: Dict[str, Any] = {}
 
+# Job currently downloading each module: { "module_code": "job_id" }
+ACTIVE_MODULES: Dict[str, str] = {}
+
+class MemoryJobStore:
+    """Keeps jobs in the process-global JOBS dict. Jobs are lost on restart."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, module_code: str, owner: Optional[str] = None):
+        now = time.time()
+        JOBS[job_id] = {
+            "id": job_id,
+            "module_code": module_code,
+            "status": "queued",
+            "progress": {},
+            "files": [],
+            "created_at": now,
+            "updated_at": now
+        }
+
+    def create_or_attach(self, job_id: str, module_code: str, owner: Optional[str] = None) -> Tuple[str, bool]:
+        with self._lock:
+            active_id = ACTIVE_MODULES.get(module_code)
+            if active_id is not None and active_id in JOBS:
+                return active_id, False
+            self.create(job_id, module_code)
+            ACTIVE_MODULES[module_code] = job_id
+            return job_id, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return JOBS.get(job_id)
+
+    def update_status(self, job_id: str, status: str, error: str = None):
+        if job_id in JOBS:
+            JOBS[job_id]["status"] = status
+            JOBS[job_id]["updated_at"] = time.time()
+            if error:
+                JOBS[job_id]["error"] = error
+            if status in FINISHED_STATUSES:
+                self._release_module(JOBS[job_id]["module_code"], job_id)
+
+    def update_progress(self, job_id: str, data: dict):
+        if job_id in JOBS:
+            JOBS[job_id]["progress"] = data
+            JOBS[job_id]["updated_at"] = time.time()
+            # Only set to processing if not already completed/failed
+            if JOBS[job_id]["status"] == "queued":
+                JOBS[job_id]["status"] = "processing"
+
+    def set_files(self, job_id: str, files: List[str]):
+        if job_id in JOBS:
+            JOBS[job_id]["files"] = files
+
+    def list(self, status: Optional[str] = None, module_code: Optional[str] = None,
+             limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        jobs = [
+            job for job in list(JOBS.values())
+            if (status is None or job["status"] == status)
+            and (module_code is None or job["module_code"] == module_code)
+        ]
+        jobs.sort(key=lambda job: job["created_at"], reverse=True)
+        return jobs[offset:offset + limit], len(jobs)
+
+    def fail_orphans(self, owner_alive: Callable[[str], bool], error: str) -> int:
+        # Jobs live and die with this process
+        return 0
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts = {}
+        for job in list(JOBS.values()):
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+    def purge(self, ttl: float) -> int:
+        cutoff = time.time() - ttl
+        expired = [
+            job_id for job_id, job in list(JOBS.items())
+            if job["status"] in FINISHED_STATUSES and job["updated_at"] < cutoff
+        ]
+        for job_id in expired:
+            JOBS.pop(job_id, None)
+        return len(expired)
+
+    def _release_module(self, module_code: str, job_id: str):
+        with self._lock:
+            if ACTIVE_MODULES.get(module_code) == job_id:
+                del ACTIVE_MODULES[module_code]
+
+
+def _create_store():
+    if JOB_STORE_BACKEND == "sqlite":
+        from app.services.sqlite_job_store import SqliteJobStore
+        return SqliteJobStore(JOB_STORE_PATH)
+    return MemoryJobStore()
+
+_store = _create_store()
+
 def get_job(job_id: str) -> Dict[str, Any]:
-    return JOBS.get(job_id)
+    return _store.get(job_id)
 
 def create_job(job_id: str, module_code: str):
-    JOBS[job_id] = {
-        "id": job_id,
-        "module_code": module_code,
-        "status": "queued",
-        "progress": {},
-        "files": []
-    }
+    _store.create(job_id, module_code)
+
+def create_or_attach_job(job_id: str, module_code: str, owner: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Creates a job unless the module is already being downloaded, in which case
+    the running job's id is returned instead. Returns (job_id, created).
+    `owner` names the process that will run a new job, if it is not a worker.
+    """
+    return _store.create_or_attach(job_id, module_code, owner)
+
+# With the in-memory store every job runs in this process, so its events can
+# be pushed to SSE streams directly. Shared stores are polled by the stream.
+PUBLISH_EVENTS = JOB_STORE_BACKEND == "memory"
+
+def job_status_event(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload of the SSE `status` event."""
+    event = {"status": job["status"], "files": list(job["files"])}
+    if job.get("error"):
+        event["error"] = job["error"]
+    return event
 
 def update_job_status(job_id: str, status: str, error: str = None):
-    if job_id in JOBS:
-        JOBS[job_id]["status"] = status
-        if error:
-            JOBS[job_id]["error"] = error
+    _store.update_status(job_id, status, error)
+    if status in FINISHED_STATUSES:
+        metrics.JOB_OUTCOMES.inc(status=status)
+    if PUBLISH_EVENTS:
+        job = _store.get(job_id)
+        if job:
+            broker.publish(job_id, "status", job_status_event(job))
 
 def update_job_progress(job_id: str, data: dict):
-    if job_id in JOBS:
-        JOBS[job_id]["progress"] = data
-        # Only set to processing if not already completed/failed
-        if JOBS[job_id]["status"] == "queued":
-            JOBS[job_id]["status"] = "processing"
+    _store.update_progress(job_id, data)
+    if PUBLISH_EVENTS:
+        broker.publish(job_id, "progress", data)
 
 def set_job_files(job_id: str, files: List[str]):
-    if job_id in JOBS:
-        JOBS[job_id]["files"] = files
+    _store.set_files(job_id, files)
+
+def list_jobs(status: Optional[str] = None, module_code: Optional[str] = None,
+              limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """Returns one page of jobs, newest first, and the total number of matches."""
+    return _store.list(status, module_code, limit, offset)
+
+def count_jobs_by_status() -> Dict[str, int]:
+    """Number of jobs in the store per status; every status is present."""
+    counts = dict.fromkeys(ACTIVE_STATUSES + FINISHED_STATUSES, 0)
+    counts.update(_store.count_by_status())
+    return counts
+
+def fail_orphaned_jobs(owner_alive: Callable[[str], bool]) -> int:
+    """Fails unfinished jobs whose owner process is gone (see tasks.job_owner)."""
+    return _store.fail_orphans(owner_alive, "Interrupted: the server stopped before the job finished.")
+
+def purge_expired_jobs(ttl: float = JOB_TTL_SECONDS) -> int:
+    """Deletes finished jobs not updated for `ttl` seconds. Returns how many were removed."""
+    return _store.purge(ttl)
 
 def get_generated_files(module_code: str) -> List[str]:
-    """Scans the output directory for generated PDFs."""
-    output_dir = os.path.join("downloads", module_code)
-    files = []
-    if os.path.exists(output_dir):
-        for f in os.listdir(output_dir):
-            if f.endswith(".pdf"):
-                files.append(f)
-    return files
+    """Names of the generated PDFs of a module, from its file index."""
+    return [entry["name"] for entry in get_file_info(module_code)]
+
+def get_file_info(module_code: str) -> List[Dict[str, Any]]:
+    """Name, size, mtime and sha256 of each generated PDF of a module."""
+    return read_index(os.path.join("downloads", module_code))
@@ -0,0 +1,104 @@
+import os
+import json
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.core.config import MANIFEST_NAME
+
+class ResumeManifest:
+    """
+    Durable record of a module's progress, `<output_dir>/.rbv_manifest.jsonl`.
+
+    Each line is one fact: a saved page (size and sha256), the page count of
+    a document, or a finished document PDF (its size). Lines are only ever
+    appended, so a crash can at worst leave a torn last line, which is
+    ignored on load. A re-run uses it to skip finished documents without
+    any request and to continue partial ones after their last saved page.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self.page_counts: Dict[str, int] = {}
+        self.pages: Dict[str, Dict[int, Tuple[int, str]]] = {}  # doc -> page -> (size, sha256)
+        self.pdfs: Dict[str, int] = {}  # doc -> size of the finished PDF
+
+        torn = self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if torn:
+            self._file.write("\n")
+
+    def _load(self) -> bool:
+        """Replays the manifest. Returns True if the last line is incomplete."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+                doc = record["doc"]
+                if "page" in record:
+                    self.pages.setdefault(doc, {})[record["page"]] = (record["size"], record["sha256"])
+                elif "page_count" in record:
+                    self.page_counts[doc] = record["page_count"]
+                elif "pdf_size" in record:
+                    self.pdfs[doc] = record["pdf_size"]
+            except (ValueError, KeyError, TypeError):
+                continue
+        return bool(content) and not content.endswith("\n")
+
+    def _append(self, record: dict):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def record_page(self, doc: str, page: int, size: int, sha256: str):
+        entry = (size, sha256)
+        with self._lock:
+            self.pages.setdefault(doc, {})[page] = entry
+        self._append({"doc": doc, "page": page, "size": entry[0], "sha256": entry[1]})
+
+    def record_page_count(self, doc: str, count: int):
+        with self._lock:
+            if self.page_counts.get(doc) == count:
+                return
+            self.page_counts[doc] = count
+        self._append({"doc": doc, "page_count": count})
+
+    def record_pdf(self, doc: str, pdf_path: str):
+        size = os.path.getsize(pdf_path)
+        with self._lock:
+            self.pdfs[doc] = size
+        self._append({"doc": doc, "pdf_size": size})
+
+    def has_page(self, doc: str, page: int, path: str) -> bool:
+        """True if the page was saved by an earlier run and `path` still holds it."""
+        entry = self.pages.get(doc, {}).get(page)
+        try:
+            return entry is not None and os.path.getsize(path) == entry[0]
+        except OSError:
+            return False
+
+    def is_complete(self, doc: str) -> bool:
+        """True once every page of a document with a known page count was saved."""
+        count = self.page_counts.get(doc)
+        pages = self.pages.get(doc, {})
+        return count is not None and all(page in pages for page in range(1, count + 1))
+
+    def is_finished(self, doc: str, pdf_path: str) -> bool:
+        """True for a document that does not exist or whose PDF is built and still on disk."""
+        if self.page_counts.get(doc) == 0:
+            return True
+        size = self.pdfs.get(doc)
+        try:
+            return size is not None and os.path.getsize(pdf_path) == size
+        except OSError:
+            return False
+
+    def page_count(self, doc: str) -> Optional[int]:
+        return self.page_counts.get(doc)
+
+    def close(self):
+        self._file.close()
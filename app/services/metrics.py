@@ -0,0 +1,338 @@
+import os
+import glob
+import json
+import math
+import time
+import atexit
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import (
+    FETCH_LATENCY_BUCKETS, MERGE_DURATION_BUCKETS, METRICS_RATE_WINDOW,
+    METRICS_DIR, METRICS_EXPORT_INTERVAL, METRICS_EXPORT_STALE
+)
+
+class _Metric:
+    """A metric family; samples are kept per tuple of label values."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # Same value in every process (read from the shared job database): never summed
+        self.shared = False
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], object]] = None) -> List[str]:
+        if values is None:
+            values = self.values()
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples(values)
+
+    def values(self) -> Dict[Tuple[str, ...], object]:
+        """A copy of the current samples, keyed by label values."""
+        raise NotImplementedError
+
+    def combine(self, a, b):
+        """Adds up the samples of two processes."""
+        return a + b
+
+    def _samples(self, values) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self, values) -> List[str]:
+        values = sorted(values.items())
+        if not values and not self.labels:
+            values = [((), 0)]
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Set directly, or read at scrape time from `set_function`."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], object]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], object], shared: bool = False):
+        """
+        `function` returns a number, or {label value(s): number} for a labelled
+        gauge. `shared` marks a value every process reads from the same place.
+        """
+        self._function = function
+        self.shared = shared
+
+    def values(self):
+        if self._function is None:
+            with self._lock:
+                return dict(self._values)
+        result = self._function()
+        if not isinstance(result, dict):
+            return {(): result}
+        return {key if isinstance(key, tuple) else (str(key),): value for key, value in result.items()}
+
+    def _samples(self, values) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def values(self):
+        with self._lock:
+            return {key: list(entry) for key, entry in self._values.items()}
+
+    def combine(self, a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def _samples(self, values) -> List[str]:
+        lines = []
+        for key, entry in sorted(values.items()):
+            for bound, count in zip(self.buckets, entry):
+                lines.append(f"{self.name}_bucket{self._label_text(key, (('le', _number(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{self._label_text(key, (('le', '+Inf'),))} {entry[-1]}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(entry[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {entry[-1]}")
+        return lines
+
+
+class RateWindow:
+    """Events per second over the last `window` seconds, in one-second buckets."""
+
+    def __init__(self, window: int = METRICS_RATE_WINDOW):
+        self.window = window
+        self._buckets = deque()  # [second, count]
+        self._lock = threading.Lock()
+
+    def add(self, count: int = 1):
+        now = int(time.monotonic())
+        with self._lock:
+            if self._buckets and self._buckets[-1][0] == now:
+                self._buckets[-1][1] += count
+            else:
+                self._buckets.append([now, count])
+            self._trim(now)
+
+    def rate(self) -> float:
+        with self._lock:
+            self._trim(int(time.monotonic()))
+            return sum(count for _, count in self._buckets) / self.window
+
+    def _trim(self, now: int):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, list]:
+        """The samples that differ per process, as JSON-friendly [label values, value] pairs."""
+        return {
+            metric.name: [[list(key), value] for key, value in metric.values().items()]
+            for metric in self._metrics if not metric.shared
+        }
+
+    def render(self, others: Sequence[Dict[str, list]] = ()) -> str:
+        """All metrics in the Prometheus text exposition format, added up with `others` snapshots."""
+        lines = []
+        for metric in self._metrics:
+            values = metric.values()
+            if not metric.shared:
+                for snapshot in others:
+                    for key, value in snapshot.get(metric.name, ()):
+                        key = tuple(key)
+                        values[key] = metric.combine(values[key], value) if key in values else value
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
+
+
+class SnapshotExporter:
+    """
+    Shares a registry with the other processes of the deployment (uvicorn
+    --workers, app.worker) through `<directory>/<pid>.json`, rewritten every
+    `interval` seconds. Whichever process answers /metrics adds the other
+    processes' snapshots to its own values; snapshots not rewritten for
+    `stale` seconds belong to processes that died and are ignored.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str,
+                 interval: float = METRICS_EXPORT_INTERVAL, stale: float = METRICS_EXPORT_STALE):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.stale = stale
+        self.path = os.path.join(directory, f"{os.getpid()}.json")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.write()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stops exporting; this process's counts leave the totals."""
+        self._stop.set()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp_path, self.path)
+
+    def others(self) -> List[Dict[str, list]]:
+        snapshots = []
+        oldest = time.time() - self.stale
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            if path == self.path:
+                continue
+            try:
+                if os.path.getmtime(path) < oldest:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed meanwhile by its exiting process
+                continue
+        return snapshots
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# Metrics of this process. Every uvicorn or app.worker process keeps its own;
+# with METRICS_DIR set they are added up across processes by render().
+REGISTRY = MetricsRegistry()
+_exporter: Optional[SnapshotExporter] = None
+
+PAGE_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "rbv_page_fetch_seconds", "Latency of upstream page requests by HTTP status (error: no response).",
+    ["status"], FETCH_LATENCY_BUCKETS
+))
+DOWNLOADED_BYTES = REGISTRY.register(Counter(
+    "rbv_downloaded_bytes_total", "Bytes of page images received from upstream."
+))
+PAGES = REGISTRY.register(Counter(
+    "rbv_pages_total", "Pages saved, including pages served from the page cache."
+))
+PAGE_RATE = RateWindow()
+PAGES_PER_SECOND = REGISTRY.register(Gauge(
+    "rbv_pages_per_second", f"Pages saved per second over the last {METRICS_RATE_WINDOW} seconds."
+))
+PAGES_PER_SECOND.set_function(PAGE_RATE.rate)
+PAGE_RETRIES = REGISTRY.register(Counter(
+    "rbv_page_retries_total", "Page requests issued again, by reason (status, network, error).", ["reason"]
+))
+PAGE_GIVE_UPS = REGISTRY.register(Counter(
+    "rbv_page_give_ups_total", "Documents abandoned (or jobs failed) after too many consecutive page errors."
+))
+MERGE_SECONDS = REGISTRY.register(Histogram(
+    "rbv_merge_seconds", "Time to produce a document's PDF, by document.", ["doc"], MERGE_DURATION_BUCKETS
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "rbv_queue_depth", "Jobs waiting to start."
+))
+ACTIVE_JOBS = REGISTRY.register(Gauge(
+    "rbv_active_jobs", "Jobs currently downloading."
+))
+JOBS = REGISTRY.register(Gauge(
+    "rbv_jobs", "Jobs in the job store by status.", ["status"]
+))
+JOB_OUTCOMES = REGISTRY.register(Counter(
+    "rbv_job_outcomes_total", "Jobs finished, by outcome.", ["status"]
+))
+
+def record_page():
+    """Counts a saved page towards rbv_pages_total and rbv_pages_per_second."""
+    PAGES.inc()
+    PAGE_RATE.add()
+
+def start_export(directory: str = METRICS_DIR):
+    """Publishes this process's metrics to `directory` (no-op when empty)."""
+    global _exporter
+    if not directory or _exporter is not None:
+        return
+    _exporter = SnapshotExporter(REGISTRY, directory)
+    _exporter.start()
+
+def render() -> str:
+    """The /metrics body: this process plus the snapshots of the other processes."""
+    return REGISTRY.render(_exporter.others() if _exporter is not None else ())
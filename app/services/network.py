@@ -1,19 +1,133 @@
+import math
+import time
+import threading
 import requests
-from typing import Dict
-from app.core.config import BASE_URL
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, Future, wait, as_completed
+from typing import Dict, Tuple
+from app.core.config import BASE_URL, HEDGE_REQUESTS, HEDGE_BURST, PAGE_CONCURRENCY_MAX
+from app.services.hedging import Hedger
+from app.services import metrics
+
+# Hedged pairs in flight at once; the hedge budget never allows more in a burst
+HEDGE_SLOTS = math.ceil(HEDGE_BURST)
+# Page requests run concurrently: a full window plus the extra request of each hedged pair
+POOL_SIZE = PAGE_CONCURRENCY_MAX + HEDGE_SLOTS
+
+def _close_response(future: Future):
+    # Losing request of a hedged pair: streamed, so closing it never reads the body
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
 
 class NetworkService:
     """Handles HTTP requests and session management."""
     
-    def __init__(self, headers: Dict[str, str]):
+    def __init__(self, headers: Dict[str, str], hedge: bool = HEDGE_REQUESTS):
         self.session = requests.Session()
         self.session.headers.update(headers)
+        # The default pool keeps 10 connections; a full window would keep reconnecting
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Hedged requests need a thread of their own to race against the original
+        self.hedger = Hedger() if hedge else None
+        self._hedge_pool = ThreadPoolExecutor(max_workers=POOL_SIZE) if hedge else None
+        self._hedge_slots = threading.BoundedSemaphore(HEDGE_SLOTS)
+
+    def close(self):
+        """Releases the hedge threads and the connection pool."""
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def fetch_page(self, doc: str, subfolder: str, page: int, stream: bool = False) -> requests.Response:
+        params = {
+            "doc": doc,
+            "format": "jpg",
+            "subfolder": subfolder,
+            "page": page
+        }
+        if not self.hedger:
+            return self.session.get(BASE_URL, params=params, timeout=20, stream=stream)
+        return self._hedged_get(params, stream)
+
+    def _timed_get(self, params: dict, stream: bool) -> Tuple[requests.Response, float]:
+        start = time.monotonic()
+        response = self.session.get(BASE_URL, params=params, timeout=20, stream=stream)
+        return response, time.monotonic() - start
+
+    def _hedged_get(self, params: dict, stream: bool) -> requests.Response:
+        """
+        Sends a second request if the first is slower than usual and returns
+        whichever sends its headers first. Both are streamed: a blocking
+        request cannot be interrupted, so the loser waits for its headers in
+        the background and is closed without reading its body.
+        """
+        delay = self.hedger.delay()
+        if delay is None:
+            response, elapsed = self._timed_get(params, stream)
+            self.hedger.record(elapsed)
+            return response
+
+        futures = [self._hedge_pool.submit(self._timed_get, params, True)]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._hedge_slots.acquire(blocking=False):
+            if self.hedger.allow_hedge():
+                futures.append(self._hedge_pool.submit(self._timed_get, params, True))
+                self._release_slot_when_done(futures)
+            else:
+                self._hedge_slots.release()
+
+        error = None
+        for future in as_completed(futures):
+            try:
+                response, elapsed = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            self.hedger.record(elapsed)
+            for other in futures:
+                if other is not future:
+                    other.add_done_callback(_close_response)
+            if not stream:
+                response.content  # read the body like a non-streamed request
+            return response
+        raise error
+
+    def _release_slot_when_done(self, futures):
+        pending = set(futures)
+        lock = threading.Lock()
+
+        def done(future):
+            with lock:
+                pending.discard(future)
+                last = not pending
+            if last:
+                self._hedge_slots.release()
+
+        for future in futures:
+            future.add_done_callback(done)
 
-    def fetch_page(self, doc: str, subfolder: str, page: int) -> requests.Response:
+    def page_exists(self, doc: str, subfolder: str, page: int) -> bool:
+        """Checks a page from its response headers only; the body is never read."""
         params = {
             "doc": doc,
             "format": "jpg",
             "subfolder": subfolder,
             "page": page
         }
-        return self.session.get(BASE_URL, params=params, timeout=20)
+        start = time.monotonic()
+        try:
+            response = self.session.get(BASE_URL, params=params, timeout=20, stream=True)
+        except (requests.ConnectionError, requests.Timeout):
+            metrics.PAGE_FETCH_SECONDS.observe(time.monotonic() - start, status="error")
+            raise
+        metrics.PAGE_FETCH_SECONDS.observe(time.monotonic() - start, status=response.status_code)
+        try:
+            # Only 404 means missing; a transient 5xx or 429 must not end the document early
+            if response.status_code != 404:
+                response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').lower()
+            return response.status_code == 200 and 'image' in content_type
+        finally:
+            response.close()
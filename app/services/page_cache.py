@@ -0,0 +1,175 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, Callable
+
+from app.core.config import PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES
+
+class PageCache:
+    """
+    Local cache of downloaded pages shared by all jobs (and processes) on a host.
+
+    Pages are stored once per content hash under `<root>/blobs/ab/<sha256>`;
+    `<root>/index.db` maps (module_code, doc, page) to a blob and tracks
+    blob sizes and last access for LRU eviction once `max_bytes` is exceeded.
+    Known document page counts are kept as well, so a fully cached module
+    needs no upstream request at all.
+    """
+
+    def __init__(self, root: str = PAGE_CACHE_DIR, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.db"), timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (last_access)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages (module_code TEXT, doc TEXT, page INTEGER, digest TEXT NOT NULL, "
+                "PRIMARY KEY (module_code, doc, page))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents (module_code TEXT, doc TEXT, pages INTEGER NOT NULL, "
+                "PRIMARY KEY (module_code, doc))"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)")
+            self._db.execute("INSERT OR IGNORE INTO meta (id, total_bytes) VALUES (0, 0)")
+
+    def get(self, module_code: str, doc: str, page: int) -> Optional[bytes]:
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT digest FROM pages WHERE module_code = ? AND doc = ? AND page = ?",
+                (module_code, doc, page)
+            ).fetchone()
+            if row:
+                self._db.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), row[0]))
+
+        data = None
+        if row:
+            try:
+                with open(self._blob_path(row[0]), "rb") as f:
+                    data = f.read()
+            except OSError:
+                # Evicted (or removed by hand) in the meantime
+                data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, module_code: str, doc: str, page: int, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        self._store(module_code, doc, page, digest, len(data), write)
+
+    def put_file(self, module_code: str, doc: str, page: int, path: str, digest: str, size: int):
+        """Adds a page already on disk (with its known sha256) without reading it into memory."""
+        self._store(module_code, doc, page, digest, size, lambda tmp_path: shutil.copyfile(path, tmp_path))
+
+    def _store(self, module_code: str, doc: str, page: int, digest: str, size: int,
+               write: Callable[[str], None]):
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            write(tmp_path)
+            os.replace(tmp_path, path)
+
+        with self._lock, self._db:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO blobs (digest, size, last_access) VALUES (?, ?, ?)",
+                (digest, size, time.time())
+            ).rowcount
+            if inserted:
+                self._db.execute("UPDATE meta SET total_bytes = total_bytes + ? WHERE id = 0", (size,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (module_code, doc, page, digest) VALUES (?, ?, ?, ?)",
+                (module_code, doc, page, digest)
+            )
+        self._evict()
+
+    def get_page_count(self, module_code: str, doc: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pages FROM documents WHERE module_code = ? AND doc = ?", (module_code, doc)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_page_count(self, module_code: str, doc: str, pages: int):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (module_code, doc, pages) VALUES (?, ?, ?)",
+                (module_code, doc, pages)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total_bytes = self._db.execute("SELECT total_bytes FROM meta WHERE id = 0").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _evict(self):
+        """Drops least recently used blobs (and the pages pointing at them) until under the cap."""
+        removed = []
+        with self._lock, self._db:
+            total = self._db.execute("SELECT total_bytes FROM meta WHERE id = 0").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            while total > self.max_bytes:
+                oldest = self._db.execute(
+                    "SELECT digest, size FROM blobs ORDER BY last_access LIMIT 64"
+                ).fetchall()
+                if not oldest:
+                    break
+                for digest, size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+                    self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                    total -= size
+                    removed.append(digest)
+            self._db.execute("UPDATE meta SET total_bytes = ? WHERE id = 0", (total,))
+            self.evictions += len(removed)
+
+        for digest in removed:
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+
+_shared_cache: Optional[PageCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_page_cache() -> PageCache:
+    """Returns the process-wide cache used by API jobs."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = PageCache()
+        return _shared_cache
@@ -1,11 +1,53 @@
+import io
 import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Tuple
 from PIL import Image
+from app.core.config import MERGE_PROCESSES
 from app.services.logger import Logger
+from app.services.pdf_writer import JpegPdfWriter
+from app.services.file_index import record_file
+
+# Process pool shared by every PDFService in this process (all API jobs)
+_merge_pool = None
+_merge_pool_lock = threading.Lock()
+
+def _get_merge_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _merge_pool
+    with _merge_pool_lock:
+        if _merge_pool is None:
+            _merge_pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _merge_pool
+
+def _merge_worker(doc_name: str, image_dir: str, output_dir: str, passthrough: bool) -> Tuple[List[str], Optional[str]]:
+    """Runs in a pool process; log lines are returned so the caller can relay them."""
+    messages = []
+    pdf_path = PDFService(passthrough=passthrough, merge_processes=0).merge_images_to_pdf(
+        doc_name, image_dir, output_dir, Logger(messages.append)
+    )
+    return messages, pdf_path
 
 class PDFService:
     """Handles File I/O and PDF generation."""
+
+    def __init__(self, passthrough: bool = True, merge_processes: int = MERGE_PROCESSES):
+        # passthrough embeds the downloaded JPEGs without decoding them;
+        # False falls back to rendering every page through Pillow.
+        self.passthrough = passthrough
+        self.merge_processes = merge_processes
+
+    def submit_merge(self, doc_name: str, image_dir: str, output_dir: str) -> Future:
+        """
+        Merges a document on the shared process pool. The future resolves to the
+        log lines of the merge, which the caller replays through its Logger, and
+        the result of merge_images_to_pdf.
+        """
+        pool = _get_merge_pool(self.merge_processes)
+        return pool.submit(_merge_worker, doc_name, image_dir, output_dir, self.passthrough)
     
-    def merge_images_to_pdf(self, doc_name: str, image_dir: str, output_dir: str, logger: Logger):
+    def merge_images_to_pdf(self, doc_name: str, image_dir: str, output_dir: str, logger: Logger) -> Optional[str]:
+        """Returns the path of the created PDF, or None if none was written."""
         logger.info(f"  [MERGING] Creating PDF for {doc_name}...")
         
         images = []
@@ -21,30 +63,83 @@ class PDFService:
 
         if not images:
             logger.info(f"  [WARNING] No images found for {doc_name}. Skipping PDF creation.")
-            return
+            return None
 
+        pdf_path = os.path.join(output_dir, f"{doc_name}.pdf")
         try:
-            first_image_path = os.path.join(image_dir, images[0])
-            first_image = Image.open(first_image_path).convert('RGB')
-            
-            other_images = []
-            for img_file in images[1:]:
-                img_path = os.path.join(image_dir, img_file)
-                img = Image.open(img_path).convert('RGB')
-                other_images.append(img)
-
-            pdf_path = os.path.join(output_dir, f"{doc_name}.pdf")
-            first_image.save(pdf_path, save_all=True, append_images=other_images)
+            if self.passthrough:
+                self._write_passthrough_pdf(image_dir, images, pdf_path)
+            else:
+                self._write_pillow_pdf(image_dir, images, pdf_path)
+            record_file(output_dir, pdf_path)
             logger.info(f"  [SUCCESS] Created {pdf_path}")
+            return pdf_path
             
         except Exception as e:
             logger.error(f"Failed to create PDF for {doc_name}: {e}")
+            return None
+
+    def open_stream_writer(self, doc_name: str, output_dir: str) -> JpegPdfWriter:
+        """Opens (or resumes) a PDF that pages are appended to as they arrive."""
+        return JpegPdfWriter(os.path.join(output_dir, f"{doc_name}.pdf"), resumable=True)
+
+    def append_page(self, writer: JpegPdfWriter, data: bytes):
+        try:
+            writer.add_page(data)
+        except ValueError:
+            writer.add_page(self._reencode_jpeg(data))
+
+    def finish_stream_writer(self, writer: JpegPdfWriter, doc_name: str, logger: Logger) -> Optional[str]:
+        """Publishes a streamed PDF. Returns its path, or None if none was written."""
+        if not writer.page_count:
+            writer.abort()
+            logger.info(f"  [WARNING] No pages found for {doc_name}. Skipping PDF creation.")
+            return None
+        try:
+            pdf_path = writer.close()
+            record_file(os.path.dirname(pdf_path), pdf_path)
+            logger.info(f"  [SUCCESS] Created {pdf_path}")
+            return pdf_path
+        except Exception as e:
+            logger.error(f"Failed to create PDF for {doc_name}: {e}")
+            return None
+
+    def _write_passthrough_pdf(self, image_dir: str, images: List[str], pdf_path: str):
+        """Embeds the JPEG files unchanged; only one page is in memory at a time."""
+        writer = JpegPdfWriter(pdf_path)
+        try:
+            for img_file in images:
+                with open(os.path.join(image_dir, img_file), "rb") as f:
+                    # Re-encodes pages that cannot be embedded as-is (e.g. arithmetic coded)
+                    self.append_page(writer, f.read())
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+
+    def _write_pillow_pdf(self, image_dir: str, images: List[str], pdf_path: str):
+        first_image_path = os.path.join(image_dir, images[0])
+        first_image = Image.open(first_image_path).convert('RGB')
+        
+        other_images = []
+        for img_file in images[1:]:
+            img_path = os.path.join(image_dir, img_file)
+            img = Image.open(img_path).convert('RGB')
+            other_images.append(img)
+
+        first_image.save(pdf_path, save_all=True, append_images=other_images)
+
+    def _reencode_jpeg(self, data: bytes) -> bytes:
+        output = io.BytesIO()
+        Image.open(io.BytesIO(data)).convert('RGB').save(output, format="JPEG", quality=95)
+        return output.getvalue()
 
     def cleanup_images(self, doc_dir: str, logger: Logger):
         try:
             logger.info(f"  [CLEANUP] Removing downloaded images...")
             for f in os.listdir(doc_dir):
-                if f.endswith(".jpg"):
+                # .part files are page downloads that never completed
+                if f.endswith(".jpg") or f.endswith(".part"):
                     os.remove(os.path.join(doc_dir, f))
             os.rmdir(doc_dir)
             logger.info(f"  [CLEANUP] Cleanup complete.")
@@ -0,0 +1,210 @@
+import os
+import json
+from typing import NamedTuple
+
+# Start-of-frame markers a PDF DCTDecode filter is guaranteed to handle:
+# baseline, extended sequential and progressive Huffman JPEGs.
+_SUPPORTED_SOF = (0xC0, 0xC1, 0xC2)
+# All other start-of-frame markers (lossless, arithmetic coded, ...)
+_OTHER_SOF = (0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+# Markers that stand alone without a length field
+_STANDALONE = (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8)
+
+_COLOR_SPACES = {1: "/DeviceGray", 3: "/DeviceRGB", 4: "/DeviceCMYK"}
+
+
+class JpegInfo(NamedTuple):
+    width: int
+    height: int
+    components: int
+    adobe: bool  # Adobe APP14 present; CMYK data is then stored inverted
+
+
+def read_jpeg_info(data: bytes) -> JpegInfo:
+    """
+    Reads the dimensions and color layout from the JPEG header without decoding.
+    Raises ValueError for anything that cannot be embedded as-is.
+    """
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+
+    adobe = False
+    pos = 2
+    size = len(data)
+    while pos < size:
+        if data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG marker stream")
+        # Skip fill bytes
+        while pos < size and data[pos] == 0xFF:
+            pos += 1
+        if pos >= size:
+            break
+        marker = data[pos]
+        pos += 1
+
+        if marker in _STANDALONE:
+            continue
+        if marker == 0xD9 or marker == 0xDA:
+            # End of image / start of scan before any frame header
+            break
+        if pos + 2 > size:
+            break
+
+        length = int.from_bytes(data[pos:pos + 2], "big")
+        segment = data[pos + 2:pos + length]
+
+        if marker == 0xEE and segment[:5] == b"Adobe":
+            adobe = True
+        elif marker in _SUPPORTED_SOF:
+            if len(segment) < 6:
+                break
+            precision = segment[0]
+            height = int.from_bytes(segment[1:3], "big")
+            width = int.from_bytes(segment[3:5], "big")
+            components = segment[5]
+            if precision != 8 or components not in _COLOR_SPACES or not width or not height:
+                raise ValueError("Unsupported JPEG frame")
+            return JpegInfo(width, height, components, adobe)
+        elif marker in _OTHER_SOF:
+            raise ValueError("Unsupported JPEG encoding")
+
+        pos += length
+
+    raise ValueError("JPEG frame header not found")
+
+
+class JpegPdfWriter:
+    """
+    Writes a PDF one page at a time, embedding JPEG bytes unchanged as
+    DCTDecode image XObjects. Only the current page is ever held in memory.
+
+    Object layout: 1 is the catalog and 2 the page tree (both written on
+    close); page i (0-based) uses 3+3i for the image, 4+3i for the content
+    stream and 5+3i for the page dictionary. Each page is one image filling
+    the page at 72 dpi, matching what Pillow's PDF plugin produces.
+
+    The file is written to `<path>.part` and renamed into place on close.
+    With `resumable=True` a checkpoint (`<path>.part.json`) is saved after
+    every page, and a new writer for the same path picks up where a crashed
+    or suspended one stopped.
+    """
+
+    def __init__(self, path: str, resumable: bool = False):
+        self.path = path
+        self.part_path = path + ".part"
+        self.state_path = self.part_path + ".json"
+        self.resumable = resumable
+        self.offsets = []  # byte offset of objects 3, 4, 5, ...
+        self.page_count = 0
+
+        if resumable and self._load_checkpoint():
+            return
+
+        self._file = open(self.part_path, "wb")
+        # Binary comment marks the file as binary for transfer tools
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        if resumable:
+            self._checkpoint()
+
+    def add_page(self, jpeg: bytes):
+        info = read_jpeg_info(jpeg)
+        first = 3 + 3 * self.page_count
+        image_obj, content_obj, page_obj = first, first + 1, first + 2
+
+        image_dict = (
+            f"<< /Type /XObject /Subtype /Image /Width {info.width} /Height {info.height} "
+            f"/ColorSpace {_COLOR_SPACES[info.components]} /BitsPerComponent 8 "
+        )
+        if info.components == 4 and info.adobe:
+            image_dict += "/Decode [1 0 1 0 1 0 1 0] "
+        image_dict += f"/Filter /DCTDecode /Length {len(jpeg)} >>"
+        self._write_stream(image_obj, image_dict, jpeg)
+
+        content = f"q {info.width} 0 0 {info.height} 0 0 cm /Im0 Do Q".encode("ascii")
+        self._write_stream(content_obj, f"<< /Length {len(content)} >>", content)
+
+        self._write_object(page_obj, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {info.width} {info.height}] "
+            f"/Resources << /XObject << /Im0 {image_obj} 0 R >> >> /Contents {content_obj} 0 R >>"
+        ))
+        self.page_count += 1
+
+        if self.resumable:
+            self._checkpoint()
+
+    def close(self) -> str:
+        """Writes the page tree, catalog and cross-reference table, then publishes the file."""
+        f = self._file
+        tail_offsets = {}
+
+        kids = " ".join(f"{5 + 3 * i} 0 R" for i in range(self.page_count))
+        tail_offsets[2] = f.tell()
+        f.write(f"2 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {self.page_count} >>\nendobj\n".encode("ascii"))
+        tail_offsets[1] = f.tell()
+        f.write(b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+
+        xref_offset = f.tell()
+        total = 3 + len(self.offsets)
+        f.write(f"xref\n0 {total}\n".encode("ascii"))
+        f.write(b"0000000000 65535 f \n")
+        for offset in [tail_offsets[1], tail_offsets[2]] + self.offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("ascii"))
+        f.write(f"trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
+        f.close()
+
+        os.replace(self.part_path, self.path)
+        self._remove(self.state_path)
+        return self.path
+
+    def suspend(self):
+        """Closes the file but keeps the partial PDF and checkpoint for a later resume."""
+        self._file.close()
+
+    def abort(self):
+        """Discards the partially written file."""
+        self._file.close()
+        self._remove(self.part_path)
+        self._remove(self.state_path)
+
+    def _checkpoint(self):
+        self._file.flush()
+        state = {"page_count": self.page_count, "offsets": self.offsets, "end": self._file.tell()}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _load_checkpoint(self) -> bool:
+        if not (os.path.exists(self.part_path) and os.path.exists(self.state_path)):
+            return False
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            page_count, offsets, end = state["page_count"], state["offsets"], state["end"]
+            if len(offsets) != 3 * page_count or os.path.getsize(self.part_path) < end:
+                return False
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        # Anything after the checkpoint is a half-written page
+        self._file = open(self.part_path, "r+b")
+        self._file.truncate(end)
+        self._file.seek(end)
+        self.page_count = page_count
+        self.offsets = offsets
+        return True
+
+    @staticmethod
+    def _remove(path: str):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _write_object(self, number: int, body: str):
+        self.offsets.append(self._file.tell())
+        self._file.write(f"{number} 0 obj\n{body}\nendobj\n".encode("ascii"))
+
+    def _write_stream(self, number: int, header: str, data: bytes):
+        self.offsets.append(self._file.tell())
+        self._file.write(f"{number} 0 obj\n{header}\nstream\n".encode("ascii"))
+        self._file.write(data)
+        self._file.write(b"\nendstream\nendobj\n")
@@ -0,0 +1,48 @@
+from typing import Optional
+
+class PageCountProbe:
+    """
+    Finds the last page of a document in O(log n) existence checks.
+
+    Gallops through pages 1, 2, 4, 8, ... until one is missing, then binary
+    searches between the last hit and the first miss. The search is driven
+    from outside so the same logic serves the sync and the async engines:
+
+        probe = PageCountProbe()
+        page = probe.next_page()
+        while page is not None:
+            probe.record(page, exists(page))
+            page = probe.next_page()
+        probe.count
+
+    A document with `max_pages` pages or more has no known count (None).
+    """
+
+    def __init__(self, max_pages: int):
+        self.max_pages = max_pages
+        self.low = 0        # highest page known to exist
+        self.high = None    # lowest page known to be missing
+
+    def next_page(self) -> Optional[int]:
+        if self.high is None:
+            page = max(1, self.low * 2)
+            if page > self.max_pages:
+                self.high = self.max_pages + 1
+            else:
+                return page
+        if self.high - self.low <= 1:
+            return None
+        return (self.low + self.high) // 2
+
+    def record(self, page: int, exists: bool):
+        if exists:
+            self.low = max(self.low, page)
+        else:
+            self.high = page if self.high is None else min(self.high, page)
+
+    @property
+    def count(self) -> Optional[int]:
+        # Page max_pages exists: the real end may lie anywhere beyond it
+        if self.low >= self.max_pages:
+            return None
+        return self.low
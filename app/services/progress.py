@@ -0,0 +1,150 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import PROGRESS_INTERVAL, PROGRESS_EWMA_ALPHA
+
+class ProgressBus:
+    """
+    Delivers download progress to its subscribers at most once per `interval`.
+
+    `publish(*args)` only remembers the arguments, so calling it for every
+    page costs the same however long the module is; the event dict is built
+    by `render(*args)` when an event actually goes out. The latest event of a
+    burst is delivered by a flusher thread once the interval has passed (so a
+    long merge does not leave a stale event behind), and `close()` delivers
+    whatever is still pending.
+
+    Events are extended with pages/sec and bytes/sec (EWMA over the fetched
+    pages reported through `add`) and, when total_pages is known, eta_seconds.
+    """
+
+    def __init__(self, render: Callable[..., Dict], interval: float = PROGRESS_INTERVAL,
+                 alpha: float = PROGRESS_EWMA_ALPHA):
+        self.render = render
+        self.interval = interval
+        self.alpha = alpha
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = None
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self._last_emit = 0.0
+        # Publisher and flusher may both deliver; an older event never follows a newer one
+        self._deliver_lock = threading.Lock()
+        self._seq = 0
+        self._delivered = 0
+        # Throughput: counters and their values when the rates were last updated
+        self._pages = 0
+        self._bytes = 0
+        self._sample = None  # (time, pages, bytes)
+        self.pages_per_sec: Optional[float] = None
+        self.bytes_per_sec: Optional[float] = None
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        self._subscribers.append(callback)
+
+    def add(self, pages: int = 0, nbytes: int = 0):
+        """Counts fetched pages and bytes for the throughput estimate."""
+        with self._lock:
+            self._pages += pages
+            self._bytes += nbytes
+
+    def publish(self, *args):
+        if not self._subscribers:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            self._pending = args
+            if time.monotonic() < self._last_emit + self.interval:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                    self._flusher.start()
+                self._wakeup.notify()
+                return
+            event = self._take_pending()
+        self._deliver(event)
+
+    def close(self):
+        """Delivers the last pending event; later publishes are dropped."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            event = self._take_pending()
+        if event is not None:
+            self._deliver(event)
+        if self._flusher is not None:
+            self._flusher.join()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    wait = self._last_emit + self.interval - time.monotonic()
+                    if self._pending is not None and wait <= 0:
+                        break
+                    self._wakeup.wait(wait if self._pending is not None else None)
+                if self._closed:
+                    return
+                event = self._take_pending()
+            self._deliver(event)
+
+    def _take_pending(self):
+        """Called with the lock held."""
+        args, self._pending = self._pending, None
+        if args is None:
+            return None
+        self._last_emit = time.monotonic()
+        self._update_rates(self._last_emit)
+        self._seq += 1
+        return self._seq, args
+
+    def _deliver(self, event):
+        seq, args = event
+        with self._deliver_lock:
+            if seq < self._delivered:
+                return
+            self._delivered = seq
+            self._send(args)
+
+    def _send(self, args):
+        data = self.render(*args)
+        if self.pages_per_sec is not None:
+            data["pages_per_sec"] = round(self.pages_per_sec, 2)
+            data["bytes_per_sec"] = round(self.bytes_per_sec)
+            total = data.get("total_pages")
+            if total and self.pages_per_sec > 0:
+                remaining = max(total - data.get("pages_done", 0), 0)
+                data["eta_seconds"] = round(remaining / self.pages_per_sec)
+        for callback in self._subscribers:
+            callback(data)
+
+    def _update_rates(self, now: float):
+        if self._sample is None:
+            self._sample = (now, self._pages, self._bytes)
+            return
+        then, pages, nbytes = self._sample
+        elapsed = now - then
+        if elapsed < self.interval / 2:
+            return
+        page_rate = (self._pages - pages) / elapsed
+        byte_rate = (self._bytes - nbytes) / elapsed
+        if self.pages_per_sec is None:
+            self.pages_per_sec, self.bytes_per_sec = page_rate, byte_rate
+        else:
+            self.pages_per_sec += self.alpha * (page_rate - self.pages_per_sec)
+            self.bytes_per_sec += self.alpha * (byte_rate - self.bytes_per_sec)
+        self._sample = (now, self._pages, self._bytes)
+
+def format_rate(data: Dict) -> str:
+    """'3.2 pages/s, 1.4 MB/s, ETA 2:05' from an event, or '' before the first estimate."""
+    if data.get("pages_per_sec") is None:
+        return ""
+    text = f"{data['pages_per_sec']:.1f} pages/s, {data['bytes_per_sec'] / (1024 * 1024):.1f} MB/s"
+    eta = data.get("eta_seconds")
+    if eta is not None:
+        minutes, seconds = divmod(eta, 60)
+        text += f", ETA {minutes // 60}:{minutes % 60:02d}:{seconds:02d}" if minutes >= 60 else f", ETA {minutes}:{seconds:02d}"
+    return text
@@ -0,0 +1,90 @@
+import asyncio
+import bisect
+import itertools
+import logging
+from urllib.parse import urlparse
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import BASE_URL, SCHEDULER_WORKERS, SCHEDULER_PER_HOST, SCHEDULER_ORDERING
+
+class JobScheduler:
+    """
+    Runs queued jobs on a fixed number of worker tasks on the event loop.
+
+    Jobs are taken in priority order (higher first, FIFO among equals) or in
+    plain arrival order, and never more than `per_host` jobs talk to the same
+    upstream host at once. A job that has to wait for its host does not hold
+    back jobs for other hosts.
+    """
+
+    def __init__(self, runner: Callable[..., Awaitable[None]], workers: int = SCHEDULER_WORKERS,
+                 per_host: int = SCHEDULER_PER_HOST, ordering: str = SCHEDULER_ORDERING):
+        self.runner = runner
+        self.workers = workers
+        self.per_host = per_host
+        self.ordering = ordering
+        self._queue: List[tuple] = []  # sorted (sort_key, job_id, host, args)
+        self._host_active: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._cond = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job_id: str, *args, priority: int = 0, host: Optional[str] = None):
+        """Queues `runner(job_id, *args)`."""
+        seq = next(self._seq)
+        sort_key = (-priority, seq) if self.ordering == "priority" else (seq,)
+        host = host or urlparse(BASE_URL).hostname
+        async with self._cond:
+            bisect.insort(self._queue, (sort_key, job_id, host, args), key=lambda entry: entry[0])
+            self._cond.notify_all()
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position among waiting jobs, or None if the job is not waiting."""
+        for position, entry in enumerate(self._queue, 1):
+            if entry[1] == job_id:
+                return position
+        return None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def active_jobs(self) -> int:
+        return sum(self._host_active.values())
+
+    def _next_runnable(self) -> Optional[tuple]:
+        for entry in self._queue:
+            if self._host_active.get(entry[2], 0) < self.per_host:
+                return entry
+        return None
+
+    async def _worker(self):
+        while True:
+            async with self._cond:
+                entry = self._next_runnable()
+                while entry is None:
+                    await self._cond.wait()
+                    entry = self._next_runnable()
+                self._queue.remove(entry)
+                _, job_id, host, args = entry
+                self._host_active[host] = self._host_active.get(host, 0) + 1
+
+            try:
+                await self.runner(job_id, *args)
+            except Exception as e:
+                logging.error(f"Job {job_id} crashed: {e}")
+            finally:
+                async with self._cond:
+                    self._host_active[host] -= 1
+                    self._cond.notify_all()
@@ -0,0 +1,155 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Callable, Dict, Any, List, Tuple, Optional
+
+from app.core.config import JOB_STALE_SECONDS
+
+_COLUMNS = "id, module_code, status, progress, files, error, created_at, updated_at"
+
+class SqliteJobStore:
+    """
+    Keeps jobs in a SQLite database in WAL mode, so job state survives restarts
+    and every uvicorn worker on the host sees the same jobs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, module_code TEXT NOT NULL, status TEXT NOT NULL, "
+            "progress TEXT NOT NULL DEFAULT '{}', files TEXT NOT NULL DEFAULT '[]', error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        # Process running the job in inline mode (see tasks.job_owner); added after the first release
+        try:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        except sqlite3.OperationalError:
+            pass  # duplicate column
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_module ON jobs (module_code, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; transactions are opened explicitly."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, module_code: str, owner: Optional[str] = None):
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, module_code, status, created_at, updated_at, owner) VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, module_code, now, now, owner)
+        )
+
+    def create_or_attach(self, job_id: str, module_code: str, owner: Optional[str] = None) -> Tuple[str, bool]:
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, so two workers cannot both miss
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE module_code = ? "
+                "AND status IN ('queued', 'processing') AND updated_at > ? "
+                "ORDER BY created_at LIMIT 1",
+                (module_code, time.time() - JOB_STALE_SECONDS)
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return row[0], False
+            self.create(job_id, module_code, owner)
+            conn.execute("COMMIT")
+            return job_id, True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def update_status(self, job_id: str, status: str, error: str = None):
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, error = COALESCE(?, error), updated_at = ? WHERE id = ?",
+            (status, error or None, time.time(), job_id)
+        )
+
+    def update_progress(self, job_id: str, data: dict):
+        # Only set to processing if not already completed/failed
+        self._conn().execute(
+            "UPDATE jobs SET progress = ?, updated_at = ?, "
+            "status = CASE WHEN status = 'queued' THEN 'processing' ELSE status END WHERE id = ?",
+            (json.dumps(data), time.time(), job_id)
+        )
+
+    def set_files(self, job_id: str, files: List[str]):
+        self._conn().execute("UPDATE jobs SET files = ? WHERE id = ?", (json.dumps(files), job_id))
+
+    def list(self, status: Optional[str] = None, module_code: Optional[str] = None,
+             limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if module_code is not None:
+            clauses.append("module_code = ?")
+            params.append(module_code)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM jobs {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [self._to_job(row) for row in rows], total
+
+    def fail_orphans(self, owner_alive: Callable[[str], bool], error: str) -> int:
+        """Fails queued/processing jobs whose owning process is gone. Returns how many."""
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, owner FROM jobs WHERE status IN ('queued', 'processing') AND owner IS NOT NULL"
+        ).fetchall()
+        failed = 0
+        for job_id, owner in rows:
+            if owner_alive(owner):
+                continue
+            failed += conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'processing')",
+                (error, time.time(), job_id)
+            ).rowcount
+        return failed
+
+    def count_by_status(self) -> Dict[str, int]:
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def purge(self, ttl: float) -> int:
+        return self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+            (time.time() - ttl,)
+        ).rowcount
+
+    @staticmethod
+    def _to_job(row) -> Dict[str, Any]:
+        job_id, module_code, status, progress, files, error, created_at, updated_at = row
+        job = {
+            "id": job_id,
+            "module_code": module_code,
+            "status": status,
+            "progress": json.loads(progress),
+            "files": json.loads(files),
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+        if error:
+            job["error"] = error
+        return job
@@ -1,18 +1,31 @@
 import os
-import logging
 import sys
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.schemas.job import JobRequest
-from app.services.job_store import update_job_progress, update_job_status, set_job_files, get_generated_files
+from app.services.job_store import (
+    update_job_progress, update_job_status, set_job_files, get_generated_files, count_jobs_by_status,
+    fail_orphaned_jobs
+)
+from app.services.page_cache import get_page_cache
+from app.core.config import EXECUTION_MODE
+from app.services.job_queue import DurableJobQueue
+from app.services.scheduler import JobScheduler
+from app.services import metrics
 
 # Add project root to sys.path to allow importing download_images
 sys.path.append(os.getcwd())
 
 try:
-    from download_images import download_images, HEADERS
+    from download_images import download_images, download_images_async, HEADERS
 except ImportError:
     # Fallback if running from inside app directory (though strictly not recommended)
     sys.path.append(os.path.join(os.getcwd(), ".."))
-    from download_images import download_images, HEADERS
+    from download_images import download_images, download_images_async, HEADERS
 
 def background_download_task(job_id: str, request: JobRequest):
     """Wrapper to run the download script in background."""
@@ -33,14 +46,147 @@ def background_download_task(job_id: str, request: JobRequest):
             update_job_progress(job_id, data)
 
         # Run the synchronous download function
-        download_images(request.module_code, subfolder, output_dir, headers, progress_callback=callback)
+        download_images(request.module_code, subfolder, output_dir, headers, progress_callback=callback,
+                        page_cache=get_page_cache())
         
         # Completion
         files = get_generated_files(request.module_code)
         set_job_files(job_id, files)
-        update_job_status(job_id, "completed")
         update_job_progress(job_id, {"message": "All tasks finished."})
+        update_job_status(job_id, "completed")
 
     except Exception as e:
         logging.error(f"Job {job_id} failed: {e}")
         update_job_status(job_id, "failed", str(e))
+
+# Store writes of progress callbacks of jobs on the event loop
+_progress_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="job-progress")
+
+class _ProgressWriter:
+    """
+    Progress callback for a job running on the event loop. The store write
+    (SQLite in shared mode) runs in a thread, one at a time per job; updates
+    arriving meanwhile are coalesced to the newest.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._pending = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def __call__(self, data: dict):
+        with self._lock:
+            self._pending = data
+            if not self._idle.is_set():
+                return
+            self._idle.clear()
+        _progress_pool.submit(self._write)
+
+    def _write(self):
+        while True:
+            with self._lock:
+                data, self._pending = self._pending, None
+                if data is None:
+                    self._idle.set()
+                    return
+            try:
+                update_job_progress(self.job_id, data)
+            except Exception as e:
+                logging.error(f"Could not record progress of job {self.job_id}: {e}")
+
+    async def drain(self):
+        """Waits until every update is written, so none lands after the final status."""
+        await asyncio.to_thread(self._idle.wait)
+
+async def async_background_download_task(job_id: str, request: JobRequest):
+    """Same as background_download_task but runs on the server's event loop."""
+    # Store calls (SQLite, reading the file index) go to threads to keep the loop free
+    callback = _ProgressWriter(job_id)
+    try:
+        await asyncio.to_thread(update_job_status, job_id, "processing")
+        
+        subfolder = f"{request.module_code}/"
+        output_dir = os.path.join("downloads", request.module_code)
+        
+        headers = HEADERS.copy()
+        headers['Referer'] = f'https://pustaka.ut.ac.id/reader/index.php?modul={request.module_code}'
+        headers['Cookie'] = f"PHPSESSID={request.phpsessid}; {request.sucuri_cookie}"
+
+        await download_images_async(request.module_code, subfolder, output_dir, headers, progress_callback=callback,
+                                    page_cache=get_page_cache())
+        
+        await callback.drain()
+        files = await asyncio.to_thread(get_generated_files, request.module_code)
+        await asyncio.to_thread(set_job_files, job_id, files)
+        await asyncio.to_thread(update_job_progress, job_id, {"message": "All tasks finished."})
+        await asyncio.to_thread(update_job_status, job_id, "completed")
+
+    except Exception as e:
+        logging.error(f"Job {job_id} failed: {e}")
+        await callback.drain()
+        await asyncio.to_thread(update_job_status, job_id, "failed", str(e))
+
+# Runs async_background_download_task for API jobs; started in the app lifespan
+scheduler = JobScheduler(async_background_download_task)
+
+# In "queue" mode the API only enqueues; app.worker processes run the jobs
+job_queue = DurableJobQueue() if EXECUTION_MODE == "queue" else None
+
+# Identifies this process in job owners; the token tells it apart from an
+# earlier process that had the same pid (containers restart with the same pids)
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+def job_owner():
+    """Owner recorded on new jobs: this process in inline mode, None when workers run them."""
+    return _OWNER if job_queue is None else None
+
+def _owner_alive(owner: str) -> bool:
+    host, pid, token = owner.rsplit(":", 2)
+    if host != socket.gethostname():
+        return True  # cannot tell
+    if int(pid) == os.getpid():
+        return owner == _OWNER
+    if os.name == "nt":
+        return True  # os.kill would terminate the process
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by another user
+    return True
+
+def fail_orphaned():
+    """
+    Fails inline jobs whose process died: their scheduler queue was in memory,
+    so nothing would ever run them. Returns how many were failed.
+    """
+    return fail_orphaned_jobs(_owner_alive)
+
+async def submit_job(job_id: str, request: JobRequest):
+    """Hands a new job to the in-process scheduler or the durable worker queue."""
+    if job_queue is not None:
+        await asyncio.to_thread(job_queue.enqueue, job_id, request.model_dump(), request.priority)
+    else:
+        await scheduler.submit(job_id, request, priority=request.priority)
+
+def _queue_depth() -> int:
+    return job_queue.depth() if job_queue is not None else scheduler.queue_depth
+
+def _active_jobs() -> int:
+    # Queued jobs run in worker processes; the shared store knows which are running
+    if job_queue is not None:
+        return count_jobs_by_status()["processing"]
+    return scheduler.active_jobs
+
+# In queue mode these come from the job database every process shares
+metrics.QUEUE_DEPTH.set_function(_queue_depth, shared=job_queue is not None)
+metrics.ACTIVE_JOBS.set_function(_active_jobs, shared=job_queue is not None)
+metrics.JOBS.set_function(count_jobs_by_status, shared=True)
+
+async def queue_position(job_id: str):
+    if job_queue is not None:
+        return await asyncio.to_thread(job_queue.position, job_id)
+    return scheduler.queue_position(job_id)
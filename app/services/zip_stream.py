@@ -0,0 +1,56 @@
+import zipfile
+from typing import Iterator, List, Tuple
+
+from app.core.config import ZIP_CHUNK_SIZE
+
+class _ZipSink:
+    """
+    Write-only, unseekable file object for ZipFile. Because it cannot seek,
+    ZipFile writes sizes and CRCs in data descriptors after each member, so
+    the archive can be sent while it is being produced.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files: List[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Yields a ZIP archive of `files` ((name in archive, path) pairs) in stored
+    mode, without a temporary file. Only one chunk of one file is in memory
+    at a time, whatever the size of the files.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, path in files:
+            info = zipfile.ZipInfo.from_file(path, arcname=name)
+            info.compress_type = zipfile.ZIP_STORED
+            # ZIP64 headers are only needed for members of 4 GiB and more
+            large = info.file_size >= zipfile.ZIP64_LIMIT
+            with open(path, "rb") as src, archive.open(info, "w", force_zip64=large) as dst:
+                while True:
+                    chunk = src.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
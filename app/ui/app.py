@@ -3,14 +3,15 @@ import tkinter as tk
 from tkinter import messagebox, filedialog
 import threading
 import os
-from datetime import datetime, timezone, timedelta
 import re # Import regex module
 from app.ui.layout import LayoutBuilder
 from app.ui.config_manager import ConfigManager
 from app.ui.utils import open_folder
+from app.ui.log_view import LogView
 from download_images import download_images
-from app.core.config import HEADERS
+from app.core.config import HEADERS, GUI_LOG_FILE_NAME
 from app.services.updater import Updater
+from app.services.progress import format_rate
 from app.core.version import VERSION
 
 class DownloaderApp:
@@ -29,6 +30,7 @@ class DownloaderApp:
         self.sucuri_cookie_var = tk.StringVar(value=self.config.get("sucuri_cookie"))
         self.download_path_var = tk.StringVar(value=self.config.get("download_path"))
         self.check_updates_var = tk.BooleanVar(value=self.config.get("check_updates_on_startup", True))
+        self.save_log_var = tk.BooleanVar(value=self.config.get("save_log", False))
         self.progress_var = tk.DoubleVar()
         
         # UI Components (Placeholder for references)
@@ -43,6 +45,8 @@ class DownloaderApp:
         # Build Layout
         self.layout = LayoutBuilder(self)
         self.layout.create_widgets()
+        self.log_view = LogView(self.root, self.log_area)
+        self.log_view.start()
 
         # Create Menu
         self.create_menu()
@@ -57,6 +61,7 @@ class DownloaderApp:
     def on_closing(self):
         # Signal the download thread to stop if it's running
         self.stop_event.set()
+        self.log_view.close()
         
         # Clear inputs except download path before saving
         data_to_save = {
@@ -64,7 +69,8 @@ class DownloaderApp:
             "phpsessid": "",    # Clear this
             "sucuri_cookie": "", # Clear this
             "download_path": self.download_path_var.get().strip(), # Keep this
-            "check_updates_on_startup": self.check_updates_var.get()
+            "check_updates_on_startup": self.check_updates_var.get(),
+            "save_log": self.save_log_var.get()
         }
         ConfigManager.save_config(data_to_save)
         self.root.destroy()
@@ -76,17 +82,8 @@ class DownloaderApp:
             self.download_path_var.set(folder_selected)
 
     def log(self, message):
-        def _update():
-            if self.log_area:
-                tz = timezone(timedelta(hours=7))
-                timestamp = datetime.now(tz).strftime("%H:%M:%S")
-                log_msg = f"[{timestamp}] {message}"
-                
-                self.log_area.config(state='normal')
-                self.log_area.insert(tk.END, log_msg + "\n")
-                self.log_area.see(tk.END)
-                self.log_area.config(state='disabled')
-        self.root.after(0, _update)
+        # Buffered; LogView flushes to the widget in batches on the Tk thread
+        self.log_view.write(message)
 
     def update_progress(self, data):
         def _update():
@@ -96,11 +93,17 @@ class DownloaderApp:
                 current_idx = data.get("current_doc_index", 0)
                 total = data.get("total_docs", 1)
                 
-                percent = (current_idx / total) * 100
+                # Page-accurate when the page counts were probed up front
+                total_pages = data.get("total_pages")
+                if total_pages:
+                    percent = min(data.get("pages_done", 0) / total_pages, 1) * 100
+                else:
+                    percent = (current_idx / total) * 100
                 
                 self.progress_var.set(percent)
                 if self.status_label:
-                    self.status_label.config(text=f"[{doc}] {message}")
+                    rate = format_rate(data)
+                    self.status_label.config(text=f"[{doc}] {message}" + (f" | {rate}" if rate else ""))
             except Exception as e:
                 print(f"Progress Update Error: {e}")
 
@@ -135,15 +138,21 @@ class DownloaderApp:
                 "module_code": module_code,
                 "phpsessid": phpsessid,
                 "sucuri_cookie": sucuri_cookie,
-                "download_path": download_path
+                "download_path": download_path,
+                "check_updates_on_startup": self.check_updates_var.get(),
+                "save_log": self.save_log_var.get()
             })
             
             self.start_btn.config(text=" Stop Process", command=self.stop_download_thread, state='normal', image=self.icon_stop, compound=tk.LEFT)
             self.open_btn.config(state='disabled')
             
-            self.log_area.config(state='normal')
-            self.log_area.delete(1.0, tk.END)
-            self.log_area.config(state='disabled')
+            self.log_view.clear()
+            if self.save_log_var.get():
+                # Full log of the session; the view only keeps the latest lines
+                os.makedirs(download_path, exist_ok=True)
+                self.log_view.open_file(os.path.join(download_path, GUI_LOG_FILE_NAME))
+            else:
+                self.log_view.close_file()
             
             self.progress_var.set(0)
             self.status_label.config(text="Starting...")
@@ -210,10 +219,7 @@ class DownloaderApp:
             self.root.after(0, lambda: self.open_btn.config(state='normal')) # Re-enable open button
     
     def clear_log_action(self):
-        if self.log_area:
-            self.log_area.config(state='normal')
-            self.log_area.delete(1.0, tk.END)
-            self.log_area.config(state='disabled')
+        self.log_view.clear()
         self.progress_var.set(0) # Reset progress bar
         self.status_label.config(text="Ready") # Reset status label
         self.log("Logs and progress cleared.")
@@ -233,6 +239,7 @@ class DownloaderApp:
         
         tools_menu = tk.Menu(menubar, tearoff=0)
         tools_menu.add_command(label="Clear Logs", command=self.clear_log_action)
+        tools_menu.add_checkbutton(label=f"Save Logs to {GUI_LOG_FILE_NAME}", variable=self.save_log_var)
         menubar.add_cascade(label="Tools", menu=tools_menu)
 
         help_menu = tk.Menu(menubar, tearoff=0)
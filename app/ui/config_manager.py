@@ -12,7 +12,8 @@ class ConfigManager:
             "phpsessid": "", 
             "sucuri_cookie": "",
             "download_path": default_path,
-            "check_updates_on_startup": False
+            "check_updates_on_startup": False,
+            "save_log": False
         }
         
         if os.path.exists(CONFIG_FILE):
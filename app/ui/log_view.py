@@ -0,0 +1,104 @@
+import threading
+import tkinter as tk
+from collections import deque
+from datetime import datetime, timezone, timedelta
+
+from app.core.config import GUI_LOG_MAX_LINES, GUI_LOG_FLUSH_MS
+
+# Log timestamps are shown in WIB
+LOG_TIMEZONE = timezone(timedelta(hours=7))
+
+class LogView:
+    """
+    Feeds a ScrolledText from any thread without flooding the Tk event loop.
+
+    `write` only appends to a buffer; a `root.after` timer moves everything
+    buffered into the widget every `interval_ms` in one insert. The widget
+    keeps the last `max_lines` lines. With `open_file` every line is also
+    appended to a log file, so nothing trimmed from the view is lost.
+    """
+
+    def __init__(self, root: tk.Misc, widget, max_lines: int = GUI_LOG_MAX_LINES,
+                 interval_ms: int = GUI_LOG_FLUSH_MS):
+        self.root = root
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._lines = 0  # lines currently in the widget
+        self._file = None
+        self._scheduled = None
+
+    def start(self):
+        self._scheduled = self.root.after(self.interval_ms, self._tick)
+
+    def write(self, message: str):
+        """Safe to call from any thread."""
+        timestamp = datetime.now(LOG_TIMEZONE).strftime("%H:%M:%S")
+        with self._lock:
+            self._pending.append(f"[{timestamp}] {message}\n")
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+        self.widget.config(state='normal')
+        self.widget.delete(1.0, tk.END)
+        self.widget.config(state='disabled')
+        self._lines = 0
+
+    def open_file(self, path: str):
+        """Appends every following line to `path` (UTF-8)."""
+        self.close_file()
+        try:
+            self._file = open(path, "a", encoding="utf-8")
+            # Lines only carry the time of day; mark where each session starts
+            self._file.write(f"--- {datetime.now(LOG_TIMEZONE):%Y-%m-%d %H:%M:%S} ---\n")
+        except OSError as e:
+            self._file = None
+            self.write(f"[WARNING] Could not open log file {path}: {e}")
+
+    def close_file(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        if self._scheduled is not None:
+            self.root.after_cancel(self._scheduled)
+            self._scheduled = None
+        self.close_file()
+
+    def flush(self):
+        """Moves buffered lines to the file and the widget. Tk thread only."""
+        with self._lock:
+            if not self._pending:
+                return
+            lines = list(self._pending)
+            self._pending.clear()
+
+        if self._file is not None:
+            try:
+                self._file.write("".join(lines))
+                self._file.flush()
+            except OSError:
+                pass
+
+        # Lines that would be trimmed right away are never inserted
+        shown = lines[-self.max_lines:]
+        self.widget.config(state='normal')
+        self.widget.insert(tk.END, "".join(shown))
+        self._lines += sum(line.count("\n") for line in shown)
+        if self._lines > self.max_lines:
+            excess = self._lines - self.max_lines
+            self.widget.delete(1.0, f"{excess + 1}.0")
+            self._lines = self.max_lines
+        self.widget.see(tk.END)
+        self.widget.config(state='disabled')
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self._scheduled = self.root.after(self.interval_ms, self._tick)
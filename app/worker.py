@@ -0,0 +1,85 @@
+"""
+Standalone download worker.
+
+Takes jobs enqueued by the API (RBV_EXECUTION_MODE=queue) from the SQLite job
+database and writes progress back to it, so downloads and PDF merges never run
+inside the API process. Run as many workers as the host has room for:
+
+    RBV_JOB_STORE=sqlite python -m app.worker --concurrency 4
+"""
+import os
+import sys
+import socket
+import asyncio
+import logging
+import argparse
+
+from app.core.config import JOB_STORE_BACKEND, WORKER_CONCURRENCY, QUEUE_POLL_INTERVAL, QUEUE_HEARTBEAT_INTERVAL
+from app.schemas.job import JobRequest
+from app.services.job_queue import DurableJobQueue
+from app.services.async_network import close_shared_client
+from app.services.tasks import async_background_download_task
+from app.services.job_store import update_job_status
+from app.services import metrics
+
+async def run_worker(concurrency: int):
+    queue = DurableJobQueue()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    running = set()
+
+    async def keep_leases():
+        while True:
+            await asyncio.sleep(QUEUE_HEARTBEAT_INTERVAL)
+            if running:
+                await asyncio.to_thread(queue.heartbeat, list(running))
+
+    async def slot():
+        while True:
+            claimed = await asyncio.to_thread(queue.claim, worker_id)
+            if not claimed:
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
+                continue
+
+            job_id, payload = claimed
+            logging.info(f"Worker {worker_id} running job {job_id}")
+            running.add(job_id)
+            try:
+                # Failures are recorded on the job by the task itself
+                await async_background_download_task(job_id, JobRequest(**payload))
+            except BaseException:
+                # Interrupted (shutdown, Ctrl+C): give the job back instead of dropping it.
+                # Synchronous on purpose, the task is being cancelled.
+                logging.info(f"Worker {worker_id} releasing job {job_id}")
+                queue.release(job_id)
+                update_job_status(job_id, "queued")
+                raise
+            else:
+                await asyncio.to_thread(queue.complete, job_id)
+            finally:
+                running.discard(job_id)
+
+    try:
+        await asyncio.gather(keep_leases(), *(slot() for _ in range(concurrency)))
+    finally:
+        await close_shared_client()
+
+def main():
+    parser = argparse.ArgumentParser(description="RBV Downloader queue worker")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="jobs this worker runs at the same time")
+    args = parser.parse_args()
+
+    if JOB_STORE_BACKEND != "sqlite":
+        print("Error: the worker needs the shared job store. Set RBV_JOB_STORE=sqlite.")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    # The API's /metrics adds this worker's download metrics to its own
+    metrics.start_export()
+    try:
+        asyncio.run(run_worker(args.concurrency))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Local stand-in for pustaka's `reader/services/view.php`, for offline benchmarks.
+
+Serves synthetic JPEG pages with configurable page counts, latency, jitter
+and error rate, plus the edge cases the downloader has to handle: 404 or an
+HTML page past the last page, and 403 once the "cookies" expire.
+
+    python -m benchmarks.mock_pustaka --port 8900 --latency 0.05 --jitter 0.02
+
+Prints `READY <port>` once listening. `GET /stats` returns request counters.
+"""
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image
+
+# Page counts of a typical module; documents left out do not exist
+DEFAULT_PAGES = "DAFIS=8,TINJAUAN=4,M1=42,M2=38,M3=45,M4=40,M5=36,M6=41"
+
+END_PAGE_HTML = b"<html><body>Halaman tidak ditemukan</body></html>"
+
+def parse_pages(spec: str) -> Dict[str, int]:
+    """Parses `DOC=count,DOC=count,...`."""
+    pages = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        doc, count = item.split("=")
+        pages[doc.strip()] = int(count)
+    return pages
+
+def make_images(width: int, height: int, variants: int = 8, seed: int = 0) -> List[bytes]:
+    """Noise JPEGs, so page sizes and decode cost resemble scanned pages."""
+    random.seed(seed)
+    images = []
+    for _ in range(variants):
+        image = Image.effect_noise((width, height), random.randint(24, 64)).convert("RGB")
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG", quality=80)
+        images.append(buf.getvalue())
+    return images
+
+
+class MockPustaka(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages: Dict[str, int], images: List[bytes], latency: float = 0.05,
+                 jitter: float = 0.0, error_rate: float = 0.0, end: str = "404", expire_after: int = 0):
+        super().__init__(address, _Handler)
+        self.pages = pages
+        self.images = images
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.end = end
+        self.expire_after = expire_after
+        self.stats = {"requests": 0, "pages": 0, "errors": 0, "forbidden": 0, "bytes": 0}
+        self.lock = threading.Lock()
+
+    def count(self, key: str, amount: int = 1) -> int:
+        with self.lock:
+            self.stats[key] += amount
+            return self.stats[key]
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections on purpose (hedged and cancelled requests)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real server
+    protocol_version = "HTTP/1.1"
+    server: MockPustaka
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, content_type: str, body: bytes, head: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+            self.server.count("bytes", len(body))
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head: bool = False):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            with server.lock:
+                body = json.dumps(server.stats).encode()
+            return self._send(200, "application/json", body, head)
+        if not url.path.endswith("/reader/services/view.php"):
+            return self._send(404, "text/plain", b"Not found", head)
+
+        requests_so_far = server.count("requests")
+        query = parse_qs(url.query)
+        try:
+            doc = query["doc"][0]
+            page = int(query["page"][0])
+        except (KeyError, ValueError):
+            return self._send(400, "text/plain", b"Bad request", head)
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        time.sleep(max(0.0, delay))
+
+        if server.expire_after and requests_so_far > server.expire_after:
+            server.count("forbidden")
+            return self._send(403, "text/html", b"<html>Forbidden</html>", head)
+        if random.random() < server.error_rate:
+            server.count("errors")
+            return self._send(503, "text/html", b"<html>Service Unavailable</html>", head)
+
+        if 1 <= page <= server.pages.get(doc, 0):
+            server.count("pages")
+            image = server.images[(len(doc) * 31 + page) % len(server.images)]
+            return self._send(200, "image/jpeg", image, head)
+
+        if server.end == "html":
+            return self._send(200, "text/html; charset=UTF-8", END_PAGE_HTML, head)
+        return self._send(404, "text/html", b"<html>Not Found</html>", head)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="page counts, e.g. DAFIS=8,M1=42")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="uniform +/- jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--end", choices=("404", "html"), default="404",
+                        help="answer past the last page: 404 or a 200 HTML page")
+    parser.add_argument("--expire-after", type=int, default=0,
+                        help="answer 403 after this many requests (0: never)")
+    parser.add_argument("--page-size", default="1240x1754", help="page image size WIDTHxHEIGHT")
+
+def server_from_args(args, port: int = 0) -> MockPustaka:
+    width, height = (int(v) for v in args.page_size.split("x"))
+    return MockPustaka(
+        ("127.0.0.1", port), parse_pages(args.pages), make_images(width, height),
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        end=args.end, expire_after=args.expire_after
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Local pustaka stand-in for benchmarks")
+    parser.add_argument("--port", type=int, default=0)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.port)
+    print(f"READY {server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
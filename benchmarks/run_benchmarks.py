@@ -0,0 +1,229 @@
+"""
+Offline benchmarks of the download pipeline against benchmarks/mock_pustaka.py.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --scenario cli --latency 0.1 --repeat 3 --json results.json
+
+Scenarios:
+    cli         download_images() facade, pages staged as .jpg then merged
+    cli-stream  download_images() with stream_to_pdf=True
+    api         POST /api/download on a real uvicorn server, polled to completion
+
+Every run happens in a fresh process with fresh output and cache
+directories. Reported per run: end-to-end module time, pages/sec over that
+time, time spent merging PDFs (in-process merges only), peak RSS of the
+process doing the work, and the upstream requests it needed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import statistics
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Any, Optional
+
+import requests
+
+from benchmarks.mock_pustaka import add_arguments, parse_pages
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("cli", "cli-stream", "api")
+MODULE_CODE = "BENCH0001"
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _process_peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak RSS of another process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _upstream_requests(base: str) -> int:
+    return requests.get(f"{base}/stats", timeout=5).json()["requests"]
+
+
+def _run_cli(base_url: str, work_dir: str, stream_to_pdf: bool) -> Dict[str, Any]:
+    """Runs in a fresh process so configuration and peak RSS are its own."""
+    os.environ["RBV_BASE_URL"] = base_url
+    os.environ["RBV_PAGE_CACHE_DIR"] = os.path.join(work_dir, "cache")
+    sys.path.insert(0, REPO_ROOT)
+
+    from download_images import download_images
+    from app.services.pdf import PDFService
+
+    merge_seconds = [0.0]
+    def timed(method):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                merge_seconds[0] += time.perf_counter() - start
+        return wrapper
+    PDFService.merge_images_to_pdf = timed(PDFService.merge_images_to_pdf)
+    PDFService.finish_stream_writer = timed(PDFService.finish_stream_writer)
+
+    output_dir = os.path.join(work_dir, "downloads", MODULE_CODE)
+    start = time.perf_counter()
+    download_images(MODULE_CODE, f"{MODULE_CODE}/", output_dir, {}, log_callback=lambda msg: None,
+                    stream_to_pdf=stream_to_pdf)
+    return {
+        "seconds": time.perf_counter() - start,
+        "merge_seconds": merge_seconds[0],
+        "peak_rss_mb": _peak_rss_mb(),
+        "pdfs": sorted(f for f in os.listdir(output_dir) if f.endswith(".pdf"))
+    }
+
+def run_cli(mock_base: str, work_dir: str, stream_to_pdf: bool) -> Dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_cli, f"{mock_base}/reader/services/view.php", work_dir, stream_to_pdf).result()
+
+def run_api(mock_base: str, work_dir: str, port: int = 8911, timeout: float = 600) -> Dict[str, Any]:
+    env = dict(os.environ,
+               RBV_BASE_URL=f"{mock_base}/reader/services/view.php",
+               RBV_PAGE_CACHE_DIR=os.path.join(work_dir, "cache"),
+               PYTHONPATH=REPO_ROOT)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=work_dir, env=env, stdout=subprocess.DEVNULL
+    )
+    api = f"http://127.0.0.1:{port}/api"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                requests.get(f"{api}/jobs", timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError("API server did not start")
+                time.sleep(0.1)
+
+        start = time.perf_counter()
+        job_id = requests.post(f"{api}/download", json={
+            "module_code": MODULE_CODE, "phpsessid": "bench", "sucuri_cookie": "bench=1"
+        }, timeout=10).json()["job_id"]
+        while True:
+            job = requests.get(f"{api}/jobs/{job_id}", timeout=10).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("Job did not finish in time")
+            time.sleep(0.05)
+        seconds = time.perf_counter() - start
+        if job["status"] == "failed":
+            raise RuntimeError(f"Job failed: {job.get('error')}")
+
+        return {
+            "seconds": seconds,
+            # Read before the server is stopped; its metrics live in the process
+            "merge_seconds": _api_merge_seconds(f"http://127.0.0.1:{port}/metrics"),
+            "peak_rss_mb": _process_peak_rss_mb(server.pid),
+            "pdfs": job["files"]
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _api_merge_seconds(metrics_url: str) -> Optional[float]:
+    """Total of rbv_merge_seconds_sum over all documents, as the server reports it."""
+    text = requests.get(metrics_url, timeout=10).text
+    sums = [float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+            if line.startswith("rbv_merge_seconds_sum")]
+    return sum(sums) if sums else None
+
+def start_mock(args) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "benchmarks.mock_pustaka", "--port", "0",
+           "--pages", args.pages, "--latency", str(args.latency), "--jitter", str(args.jitter),
+           "--error-rate", str(args.error_rate), "--end", args.end,
+           "--expire-after", str(args.expire_after), "--page-size", args.page_size]
+    mock = subprocess.Popen(cmd, cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+    line = mock.stdout.readline()
+    if not line.startswith("READY"):
+        mock.kill()
+        raise RuntimeError("Mock server did not start")
+    mock.port = int(line.split()[1])
+    return mock
+
+def _fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+def main():
+    parser = argparse.ArgumentParser(description="RBV Downloader offline benchmarks")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    total_pages = sum(parse_pages(args.pages).values())
+
+    mock = start_mock(args)
+    mock_base = f"http://127.0.0.1:{mock.port}"
+    results = []
+    try:
+        for scenario in scenarios:
+            for run in range(args.repeat):
+                work_dir = tempfile.mkdtemp(prefix="rbv-bench-")
+                before = _upstream_requests(mock_base)
+                try:
+                    if scenario == "api":
+                        result = run_api(mock_base, work_dir)
+                    else:
+                        result = run_cli(mock_base, work_dir, stream_to_pdf=scenario == "cli-stream")
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                result.update({
+                    "scenario": scenario,
+                    "run": run + 1,
+                    "pages": total_pages,
+                    "pages_per_sec": total_pages / result["seconds"],
+                    "upstream_requests": _upstream_requests(mock_base) - before
+                })
+                results.append(result)
+                print(f"{scenario:<11} run {run + 1}: {result['seconds']:.2f}s, "
+                      f"{result['pages_per_sec']:.1f} pages/s, merge {_fmt(result['merge_seconds'], '.2f')}s, "
+                      f"peak RSS {_fmt(result['peak_rss_mb'], '.0f')} MB, "
+                      f"{result['upstream_requests']} requests, {len(result['pdfs'])} PDFs")
+    finally:
+        mock.terminate()
+        mock.wait(timeout=10)
+
+    print(f"\n{'scenario':<11} {'median s':>9} {'pages/s':>8} {'merge s':>8} {'RSS MB':>7}")
+    for scenario in scenarios:
+        runs = [r for r in results if r["scenario"] == scenario]
+        merges = [r["merge_seconds"] for r in runs if r["merge_seconds"] is not None]
+        rss = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+        seconds = statistics.median(r["seconds"] for r in runs)
+        print(f"{scenario:<11} {seconds:>9.2f} {total_pages / seconds:>8.1f} "
+              f"{_fmt(statistics.median(merges) if merges else None, '>8.2f'):>8} "
+              f"{_fmt(max(rss) if rss else None, '>7.0f'):>7}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,78 @@
 import os
+import sys
 from requests.exceptions import ConnectionError
 
-from app.core.config import HEADERS, DOCUMENTS
+from app.core.config import HEADERS, DOCUMENTS, PAGE_CONCURRENCY, STREAM_TO_PDF
 from app.services.network import NetworkService
 from app.services.pdf import PDFService
 from app.services.downloader import ModuleDownloader
+from app.services.progress import format_rate
 
 # --- Facade for Backward Compatibility ---
 
 def download_images(module_code, subfolder, output_dir, headers, 
-                    progress_callback=None, log_callback=None, stop_event=None):
+                    progress_callback=None, log_callback=None, stop_event=None,
+                    concurrency=PAGE_CONCURRENCY, stream_to_pdf=STREAM_TO_PDF, page_cache=None):
     """
     Legacy entry point that initializes the services and starts the downloader.
+    `concurrency` is the number of page requests kept in flight per document,
+    `stream_to_pdf` appends pages to the PDFs directly instead of staging .jpg files
+    and `page_cache` (a PageCache) is consulted before fetching any page.
     """
     network_service = NetworkService(headers)
     pdf_service = PDFService()
-    downloader = ModuleDownloader(network_service, pdf_service)
+    downloader = ModuleDownloader(network_service, pdf_service, concurrency=concurrency,
+                                  stream_to_pdf=stream_to_pdf, cache=page_cache)
     
-    downloader.process(
-        module_code, 
-        subfolder, 
-        output_dir, 
-        progress_callback=progress_callback, 
-        log_callback=log_callback, 
-        stop_event=stop_event
+    try:
+        downloader.process(
+            module_code, 
+            subfolder, 
+            output_dir, 
+            progress_callback=progress_callback, 
+            log_callback=log_callback, 
+            stop_event=stop_event
+        )
+    finally:
+        network_service.close()
+
+
+async def download_images_async(module_code, subfolder, output_dir, headers,
+                                progress_callback=None, log_callback=None, stop_event=None,
+                                concurrency=PAGE_CONCURRENCY, stream_to_pdf=STREAM_TO_PDF, page_cache=None,
+                                client=None, downloads_done=None):
+    """
+    asyncio counterpart of download_images, used by the API server so that jobs
+    run on its event loop and share one connection pool (`client` overrides
+    the process-wide one). `downloads_done` is called once only merging is left.
+    """
+    from app.services.async_network import AsyncNetworkService
+    from app.services.async_downloader import AsyncModuleDownloader
+
+    network_service = AsyncNetworkService(headers, client=client)
+    pdf_service = PDFService()
+    downloader = AsyncModuleDownloader(network_service, pdf_service, concurrency=concurrency,
+                                       stream_to_pdf=stream_to_pdf, cache=page_cache)
+
+    await downloader.process(
+        module_code,
+        subfolder,
+        output_dir,
+        progress_callback=progress_callback,
+        log_callback=log_callback,
+        stop_event=stop_event,
+        downloads_done=downloads_done
     )
 
 
 # --- CLI Entry Point ---
 
 def main():
+    if len(sys.argv) > 1:
+        # Arguments select the non-interactive batch mode
+        from app.batch import main as batch_main
+        sys.exit(batch_main(sys.argv[1:]))
+
     print("--- Pustaka UT Downloader Setup ---")
     
     print("\nTo get the Module Code:")
@@ -73,13 +116,24 @@ def main():
             doc = data.get("doc", "?")
             message = data.get("message", "")
             current = data.get("current_doc_index", 0)
+            total_pages = data.get("total_pages")
             
             pbar.set_description(f"Processing {doc}")
-            pbar.set_postfix_str(message, refresh=True)
+            rate = format_rate(data)
+            pbar.set_postfix_str(f"{message} | {rate}" if rate else message, refresh=False)
             
-            if current > last_doc_index[0]:
+            if total_pages:
+                # Page-accurate once the page counts are known
+                if pbar.total != total_pages:
+                    pbar.reset(total=total_pages)
+                    pbar.unit = "page"
+                pbar.n = min(data.get("pages_done", 0), total_pages)
+                pbar.refresh()
+            elif current > last_doc_index[0]:
                 pbar.update(current - last_doc_index[0])
                 last_doc_index[0] = current
+            else:
+                pbar.refresh()
 
         download_images(
             module_code, 
@@ -90,8 +144,8 @@ def main():
             log_callback=cli_logger
         )
         
-        if pbar.n < len(DOCUMENTS):
-             pbar.update(len(DOCUMENTS) - pbar.n)
+        if pbar.n < pbar.total:
+             pbar.update(pbar.total - pbar.n)
         pbar.close()
         print("\nAll downloads completed successfully.")
 
@@ -1,8 +1,11 @@
 import tkinter as tk
 import sys
+import multiprocessing
 from app.ui.app import DownloaderApp
 
 if __name__ == "__main__":
+    # Required for the PDF merge process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = DownloaderApp(root)
     root.mainloop()
@@ -2,6 +2,7 @@ from fastapi import FastAPI, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 import uuid
 import os
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 from fastapi.staticfiles import StaticFiles
@@ -9,6 +10,7 @@ from fastapi.responses import FileResponse
 
 # Import the existing logic
 from download_images import download_images, HEADERS
+from app.services.file_index import read_index
 
 app = FastAPI(title="RBV Downloader API")
 
@@ -30,14 +32,8 @@ JOBS: Dict[str, Any] = {}
 # -----------------------------------------------------------------------------
 
 def get_generated_files(module_code: str):
-    """Scans the output directory for generated PDFs."""
-    output_dir = os.path.join("downloads", module_code)
-    files = []
-    if os.path.exists(output_dir):
-        for f in os.listdir(output_dir):
-            if f.endswith(".pdf"):
-                files.append(f)
-    return files
+    """Lists the generated PDFs from the module's file index."""
+    return [entry["name"] for entry in read_index(os.path.join("downloads", module_code))]
 
 def update_job_progress(job_id: str, data: dict):
     """Callback function to update job progress."""
@@ -103,9 +99,9 @@ async def get_job_status(job_id: str):
     if job_id not in JOBS:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # If completed, ensure file list is up to date
+    # If completed, ensure file list is up to date (reading the index may hash new PDFs)
     if JOBS[job_id]["status"] == "completed":
-        JOBS[job_id]["files"] = get_generated_files(JOBS[job_id]["module_code"])
+        JOBS[job_id]["files"] = await asyncio.to_thread(get_generated_files, JOBS[job_id]["module_code"])
         
     return JOBS[job_id]
 
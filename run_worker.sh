@@ -0,0 +1,2 @@
+#!/bin/bash
+RBV_JOB_STORE=sqlite ./.venv/bin/python -m app.worker "$@"